@@ -0,0 +1,184 @@
+"""
+Solve many puzzles in parallel and stream one JSON line per result.
+
+syntax: python batch.py Map/ [--algorithm a*] [--heuristic pdb]
+                        [--workers 4] [--order completion|input]
+                        [--max-nodes N] [--time-limit S] [--max-memory MB]
+
+A source is a directory (every *.txt in it), a glob pattern, or a file.
+A file may hold several puzzles separated by blank lines.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from feasibility import check
+from heuristics import HEURISTICS, PatternDatabase
+from problem import load_file, solution_cost
+from solver import (SOLVERS, a_star_solver, anytime_a_star, beam_search,
+                    ida_star)
+from stats import (Budget, BudgetExhausted, peak_memory, reset_peak_memory,
+                   resident_memory)
+
+INFORMED = (a_star_solver, ida_star, anytime_a_star, beam_search)
+"""Solvers that accept a heuristic keyword."""
+
+_pattern_databases = dict()
+"""Pattern databases built by this worker process, by layout signature."""
+
+
+def read_puzzles(sources):
+    """Return a list of (name, lines) pairs for every puzzle in sources."""
+    puzzles = []
+    for source in sources:
+        if os.path.isdir(source):
+            filenames = sorted(glob.glob(os.path.join(source, '*.txt')))
+        elif glob.has_magic(source):
+            filenames = sorted(glob.glob(source))
+        else:
+            filenames = [source]
+        for filename in filenames:
+            with open(filename) as puzzle_file:
+                blocks = [[]]
+                for line in puzzle_file:
+                    line = line.strip()
+                    if line:
+                        blocks[-1].append(line)
+                    elif blocks[-1]:
+                        blocks.append([])
+            blocks = [block for block in blocks if block]
+            if len(blocks) == 1:
+                puzzles.append((filename, blocks[0]))
+            else:
+                puzzles.extend(('{0}#{1}'.format(filename, i), block)
+                               for i, block in enumerate(blocks, 1))
+    return puzzles
+
+
+def _heuristic(problem, name, pdb_dir):
+    if name != 'pdb':
+        return HEURISTICS[name]
+    signature = problem.layout.signature
+    if signature not in _pattern_databases:
+        if pdb_dir:
+            pdb = PatternDatabase.cached(problem, pdb_dir)
+        else:
+            pdb = PatternDatabase.build(problem)
+        _pattern_databases[signature] = pdb
+    return _pattern_databases[signature]
+
+
+def solve_puzzle(task):
+    """Solve one (name, lines, algorithm, heuristic, pdb_dir, limits)
+    task and return its result record. limits are the keyword arguments
+    of the stats.Budget the check and the search run within. Every
+    record has the same fields; its time covers the whole task."""
+    name, lines, algorithm, heuristic, pdb_dir, limits = task
+    search = SOLVERS[algorithm]
+    record = {'map': name, 'algorithm': algorithm}
+    if search in INFORMED:
+        record['heuristic'] = heuristic
+    record.update({'moves': None, 'cost': None, 'nodes': 0, 'time': None,
+                   'stopped': None, 'unsolvable': None})
+    # Measure the peak of this task alone, not of the worker's earlier ones
+    fresh_peak = reset_peak_memory()
+    start_rss = resident_memory()
+    start_time = time.time()
+    try:
+        problem = load_file(lines)
+        # One budget covers the walk of the component and the search
+        budget = None
+        if any(limit is not None for limit in limits.values()):
+            budget = Budget(**limits)
+        verdict = check(problem, limit=limits.get('max_expanded'),
+                        budget=budget)
+        if verdict['solvable'] is False:
+            record['unsolvable'] = verdict['reason']
+        else:
+            options = dict()
+            if search in INFORMED and problem.layout.goal is not None:
+                options['heuristic'] = _heuristic(problem, heuristic,
+                                                  pdb_dir)
+            if budget is not None:
+                results = budget.run(search, problem, **options)
+            else:
+                # No limits: skip the cost of counting and timing the search
+                results = search(problem, **options)
+                results['stopped'] = None
+            solution = results['solutions'][0] if results['solutions'] \
+                else None
+            record.update({
+                'moves': len(solution) - 1 if solution else None,
+                'cost': solution_cost(solution) if solution else None,
+                'nodes': results['visited'],
+                'stopped': results['stopped'],
+            })
+    except BudgetExhausted as e:
+        record['stopped'] = e.reason   # While checking the map
+    except ValueError as e:
+        record['error'] = str(e)
+    record.update({
+        'time': round(time.time() - start_time, 6),
+    })
+    # Peak resident set of the worker during this task, in KB, and its
+    # growth over the memory the worker held at the start, which earlier
+    # tasks may have left high; where the peak cannot be restarted, the
+    # resident set at the end of the task stands in for it. Both are None
+    # where the system does not report memory (Windows)
+    peak = peak_memory() if fresh_peak else resident_memory()
+    record.update({'peak_rss_kb': peak,
+                   'rss_growth_kb': None if peak is None or start_rss is None
+                   else max(peak - start_rss, 0)})
+    return record
+
+
+def solve_all(puzzles, algorithm='a*', heuristic='cells', workers=None,
+              order='completion', pdb_dir=None, limits=None):
+    """Solve puzzles on a process pool, yielding result records as they
+    become available in completion or input order. The solvability check
+    and search of each puzzle run within a stats.Budget made from the
+    limits keyword arguments; its max_memory counts the resident memory
+    of the whole worker process."""
+    tasks = [(name, lines, algorithm, heuristic, pdb_dir, limits or {})
+             for name, lines in puzzles]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if order == 'input':
+            yield from executor.map(solve_puzzle, tasks, chunksize=4)
+        else:
+            futures = [executor.submit(solve_puzzle, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve puzzles in parallel.')
+    parser.add_argument('sources', nargs='+',
+                        help='puzzle directories, glob patterns or files')
+    parser.add_argument('--algorithm', default='a*', choices=list(SOLVERS))
+    parser.add_argument('--heuristic', default='cells',
+                        choices=list(HEURISTICS) + ['pdb'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--order', default='completion',
+                        choices=['completion', 'input'])
+    parser.add_argument('--pdb-dir', default=None,
+                        help='directory to keep pattern databases in')
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help='states one search may expand')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='seconds one search may take')
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help='MB a worker process may use')
+    args = parser.parse_args()
+    limits = {'max_expanded': args.max_nodes, 'deadline': args.time_limit,
+              'max_memory': None if args.max_memory is None
+              else args.max_memory * 1024}
+
+    for record in solve_all(read_puzzles(args.sources), args.algorithm,
+                            args.heuristic, args.workers, args.order,
+                            args.pdb_dir, limits):
+        sys.stdout.write(json.dumps(record) + '\n')
+        sys.stdout.flush()
@@ -0,0 +1,283 @@
+"""
+Reproducible benchmark of the solvers over the Map/ corpus.
+
+syntax: python benchmark.py run [--output results.json] [--repeat 5]
+                                [--warmup 1] [--solvers a*,ucs] [--maps Map/]
+        python benchmark.py compare baseline.json results.json
+                                [--threshold 0.10]
+        python benchmark.py scale [--sizes 6,8,10] [--boards 5]
+                                  [--max-nodes 20000] [--seed 0]
+
+Every (solver, map) pair is measured in a fresh process: a number of
+warmup runs, then repeated timed runs. Peak memory is the resident set
+size reported by the operating system for that process, so no
+tracemalloc overhead is added to the search. compare exits with status 1
+when any median time grew by more than the threshold, or when node
+counts or solution costs changed.
+
+scale measures how search cost grows with the board: for each size it
+makes random solvable boards of about the classic density, runs A* on
+each within a node budget, and reports expanded states per second and
+the bytes of Python memory (tracemalloc, in a second run) per state.
+"""
+import argparse
+import glob
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+from feasibility import check
+from problem import Geometry, Problem, load_file, solution_cost
+from solver import SOLVERS, a_star_solver
+from stats import Budget
+from vehicle import CAR_IDS, TRUCK_IDS, Vehicle
+
+DEFAULT_SOLVERS = ['bfs', 'dfs', 'dls', 'ucs', 'a*']
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _measure(algorithm, filename, warmup, repeat, queue):
+    """Child process body: time one solver on one map, report to queue."""
+    with open(filename) as rushhour_file:
+        problem = load_file(rushhour_file)
+    search = SOLVERS[algorithm]
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    for _ in range(warmup):
+        search(problem)
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        results = search(problem)
+        times.append(time.perf_counter() - start_time)
+
+    solution = results['solutions'][0] if results['solutions'] else None
+    queue.put({
+        'times': times,
+        'nodes': results['visited'],
+        'moves': len(solution) - 1 if solution else None,
+        'cost': solution_cost(solution) if solution else None,
+        'base_rss_kb': base_rss,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    })
+
+
+def measure(algorithm, filename, warmup=1, repeat=5):
+    """Benchmark one solver on one map in a fresh process."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure,
+                              args=(algorithm, filename, warmup, repeat,
+                                    queue))
+    process.start()
+    result = queue.get()
+    process.join()
+
+    times = result.pop('times')
+    median = statistics.median(times)
+    result.update({
+        'median': median,
+        'p90': percentile(times, 0.9),
+        'min': min(times),
+        'max': max(times),
+        'nodes_per_second': result['nodes'] / median if median else None,
+    })
+    return result
+
+
+def run(solvers, filenames, warmup=1, repeat=5):
+    """Benchmark every solver on every map; return the report dict."""
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'warmup': warmup,
+            'repeat': repeat,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': dict(),
+    }
+    for algorithm in solvers:
+        for filename in filenames:
+            name = '{0} {1}'.format(algorithm, os.path.basename(filename))
+            result = measure(algorithm, filename, warmup, repeat)
+            report['results'][name] = result
+            print(f"{name}: median {result['median']:.4f}s "
+                  f"p90 {result['p90']:.4f}s "
+                  f"{result['nodes']} nodes "
+                  f"({result['nodes_per_second'] or 0:.0f}/s) "
+                  f"peak RSS {result['peak_rss_kb']} KB", file=sys.stderr)
+    return report
+
+
+def random_board(size, rng, density=0.5, attempts=1000):
+    """
+    A random solvable size x size board, with X at the left of the row
+    above the middle and other vehicles covering about density of the
+    cells. Classic ids are used while they last, then v1, v2, ...
+    """
+    geometry = Geometry(size, size)
+    row = (size - 1) // 2
+    for _ in range(attempts):
+        vehicles = [Vehicle('X', 0, row, 'H')]
+        taken = set(vehicles[0].cells())
+        cars = sorted(CAR_IDS - {'X'})
+        trucks = sorted(TRUCK_IDS)
+        names = ('v{0}'.format(k) for k in range(1, size * size))
+        misses = 0
+        while len(taken) < density * size * size and misses < 100:
+            length = rng.choice((2, 2, 2, 3))
+            pool = cars if length == 2 else trucks
+            vid = pool.pop(0) if pool else next(names)
+            orientation = rng.choice('HV')
+            x = rng.randrange(size - (length - 1 if orientation == 'H' else 0))
+            y = rng.randrange(size - (length - 1 if orientation == 'V' else 0))
+            vehicle = Vehicle(vid, x, y, orientation, length)
+            cells = set(vehicle.cells())
+            if cells & taken or (orientation == 'H' and y == row):
+                misses += 1
+                if vid in CAR_IDS or vid in TRUCK_IDS:
+                    pool.insert(0, vid)
+                continue
+            vehicles.append(vehicle)
+            taken |= cells
+        problem = Problem(vehicles, geometry)
+        if not problem.solved() and \
+                check(problem, limit=100000)['solvable']:
+            return problem
+    raise ValueError('No solvable {0}x{0} board found'.format(size))
+
+
+def scale(sizes, boards=5, max_nodes=20000, seed=0):
+    """Benchmark A* on random boards of each size; return the report
+    dict."""
+    rng = random.Random(seed)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'boards': boards,
+            'max_nodes': max_nodes,
+            'seed': seed,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': dict(),
+    }
+    for size in sizes:
+        rates = []
+        footprints = []
+        vehicles = []
+        for _ in range(boards):
+            problem = random_board(size, rng)
+            vehicles.append(len(problem.positions))
+            budget = Budget(max_expanded=max_nodes)
+            budget.run(a_star_solver, problem)
+            rates.append(budget.expanded / budget.elapsed)
+            # Again under tracemalloc, which slows the search down
+            tracemalloc.start()
+            results = Budget(max_expanded=max_nodes).run(a_star_solver,
+                                                         problem)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            footprints.append(peak / max(results['stats']['expanded'], 1))
+        result = {
+            'vehicles': statistics.median(vehicles),
+            'code_bits': problem.layout.code_bits,
+            'states_per_second': statistics.median(rates),
+            'bytes_per_state': statistics.median(footprints),
+        }
+        report['results']['{0}x{0}'.format(size)] = result
+        print(f"{size}x{size}: {result['vehicles']} vehicles "
+              f"{result['states_per_second']:.0f} states/s "
+              f"{result['bytes_per_state']:.0f} bytes/state", file=sys.stderr)
+    return report
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return a list of regression messages of current against baseline."""
+    regressions = []
+    for name, old in sorted(baseline['results'].items()):
+        new = current['results'].get(name)
+        if new is None:
+            regressions.append('{0}: missing'.format(name))
+            continue
+        for field in ('nodes', 'cost'):
+            if new[field] != old[field]:
+                regressions.append('{0}: {1} changed {2} -> {3}'.format(
+                    name, field, old[field], new[field]))
+        if new['median'] > old['median'] * (1 + threshold):
+            regressions.append('{0}: median {1:.4f}s -> {2:.4f}s '
+                               '(+{3:.0%})'.format(
+                                   name, old['median'], new['median'],
+                                   new['median'] / old['median'] - 1))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the solvers.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('--output', default=None)
+    run_parser.add_argument('--warmup', type=int, default=1)
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--solvers', default=','.join(DEFAULT_SOLVERS))
+    run_parser.add_argument('--maps', default='Map/')
+
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10)
+
+    scale_parser = commands.add_parser('scale')
+    scale_parser.add_argument('--output', default=None)
+    scale_parser.add_argument('--sizes', default='6,8,10')
+    scale_parser.add_argument('--boards', type=int, default=5)
+    scale_parser.add_argument('--max-nodes', type=int, default=20000)
+    scale_parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        if os.path.isdir(args.maps):
+            filenames = sorted(glob.glob(os.path.join(args.maps, 'map_*.txt')))
+        else:
+            filenames = sorted(glob.glob(args.maps))
+        report = run(args.solvers.split(','), filenames, args.warmup,
+                     args.repeat)
+        if args.output:
+            with open(args.output, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+        else:
+            json.dump(report, sys.stdout, indent=2)
+    elif args.command == 'scale':
+        report = scale([int(size) for size in args.sizes.split(',')],
+                       args.boards, args.max_nodes, args.seed)
+        if args.output:
+            with open(args.output, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+        else:
+            json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        with open(args.current) as current_file:
+            current = json.load(current_file)
+        regressions = compare(baseline, current, args.threshold)
+        for message in regressions:
+            print(message)
+        print('{0} regressions'.format(len(regressions)))
+        sys.exit(1 if regressions else 0)
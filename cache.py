@@ -0,0 +1,228 @@
+"""
+On-disk cache of solutions, shared by the command line and the GUI.
+
+Entries are keyed by the board, the algorithm, the cost model and the
+version of the entry format, and kept in a sqlite database so that several processes can read and write
+it at the same time. The least recently used entries are evicted once the
+database holds more than capacity of them. A small in-memory cache sits
+in front of it; its hits do not refresh the disk entries, so eviction
+order is only approximately least recently used.
+
+syntax: python cache.py [cache file]     (prints the cache contents)
+"""
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+
+from problem import map_lines, solution_steps
+from solver import Node
+from symmetry import canonical, inverse, rename_steps
+
+DEFAULT_PATH = os.environ.get(
+    'RUSHHOUR_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'rushhour', 'solutions.db'))
+"""Cache file used when none is given, overridden by $RUSHHOUR_CACHE."""
+
+COST_MODELS = {'ucs': 'length', 'a*': 'length', 'ida*': 'length',
+               'awa*': 'length', 'beam': 'length'}
+"""Cost model optimised by each algorithm; the others count moves."""
+
+SCHEMA = 1
+"""Version of the entries; raise it when the solvers or the stored moves
+change, so that entries written before are no longer read."""
+
+UNCACHED = {'dfs', 'dls'}
+"""Algorithms whose results are not cached: they are not optimal and
+depend on the order moves are generated in."""
+
+NO_SOLUTION = None
+"""Stored moves of a board the algorithm found no solution for."""
+
+
+def board_key(problem):
+    """Text of a board: the lines of its map file (see map_lines()), with
+    its vehicles sorted by id; the size, walls and exit of a board that is
+    not classic come first. Pass the canonical board to give relabellings
+    the same key."""
+    lines = map_lines(problem)
+    if any(' ' in line for line in lines):
+        return '; '.join(lines)
+    return ' '.join(lines)
+
+
+STEP = re.compile(r'(.+?)([LRUD])(\d*)$')
+"""A step of solution_steps(): vehicle id, direction and, for slides,
+the distance in cells."""
+
+
+def replay(problem, steps):
+    """Rebuild a solution path of Nodes by applying steps to problem.
+
+    Exceptions:
+        ValueError: when a step is not a legal move
+    """
+    node = Node(problem)
+    for step in steps:
+        vid, direction, distance = STEP.match(step).groups()
+        if distance:
+            move = (vid, direction, int(distance))
+            successors = node.state.slide_successors()
+        else:
+            move = (vid, direction)
+            successors = node.state.successors()
+        for candidate, child in successors:
+            if candidate == move:
+                node = Node(child, node, move)
+                break
+        else:
+            raise ValueError('Illegal move {0}'.format(step))
+    return node.path()
+
+
+class SolutionCache(object):
+    """
+    Least recently used cache of solutions in a sqlite database.
+
+    get() and put() work with the results dictionaries of the solvers,
+    reduced to the first solution and the visited count. Solutions found
+    with the slide move model are kept under the cost model name prefixed
+    with 'slide-'. Boards are stored in their canonical labelling (see
+    symmetry.py), so boards that only differ by the ids of interchangeable
+    vehicles share their entries; the stored moves are renamed back to the
+    ids of the board that is asked for.
+    """
+
+    def __init__(self, filename=DEFAULT_PATH, capacity=100000,
+                 memory_size=256):
+        """Open or create a cache.
+
+        Keyword Arguments:
+            filename: sqlite database file (default=DEFAULT_PATH)
+            capacity: entries kept on disk before eviction (default=100000)
+            memory_size: entries also kept in memory (default=256)
+        """
+        if os.path.dirname(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+        self.capacity = capacity
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        # Writers from other processes wait up to timeout seconds for the
+        # lock; write-ahead logging lets readers go on meanwhile.
+        self.connection = sqlite3.connect(filename, timeout=30)
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            columns = [row[1] for row in self.connection.execute(
+                'PRAGMA table_info(solutions)')]
+            if columns and 'schema' not in columns:
+                # Written before entries had a version
+                self.connection.execute('DROP TABLE solutions')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS solutions ('
+                ' board TEXT, algorithm TEXT, cost_model TEXT,'
+                ' schema INTEGER, moves TEXT, visited INTEGER, used REAL,'
+                ' PRIMARY KEY (board, algorithm, cost_model, schema))')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS solutions_used'
+                ' ON solutions (used)')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _key(self, board, algorithm, cost_model, model):
+        cost_model = cost_model or COST_MODELS.get(algorithm, 'unit')
+        if model != 'step':
+            cost_model = '{0}-{1}'.format(model, cost_model)
+        return (board_key(board), algorithm, cost_model, SCHEMA)
+
+    def get(self, problem, algorithm, cost_model=None, model='step'):
+        """Cached results of algorithm on problem, or None, always for
+        the algorithms in UNCACHED.
+
+        The results have the same 'visited' and 'solutions' fields as those
+        of the solvers, with at most one solution.
+        """
+        if algorithm in UNCACHED:
+            return None
+        board, names = canonical(problem)
+        key = self._key(board, algorithm, cost_model, model)
+        value = self.memory.get(key)
+        if value is None:
+            with self.connection:
+                row = self.connection.execute(
+                    'SELECT moves, visited FROM solutions WHERE board = ?'
+                    ' AND algorithm = ? AND cost_model = ? AND schema = ?',
+                    key).fetchone()
+                if row is None:
+                    return None
+                self.connection.execute(
+                    'UPDATE solutions SET used = ? WHERE board = ?'
+                    ' AND algorithm = ? AND cost_model = ? AND schema = ?',
+                    (time.time(),) + key)
+            value = row
+        self._remember(key, value)
+
+        moves, visited = value
+        if moves is NO_SOLUTION:
+            solutions = []
+        else:
+            steps = rename_steps(moves.split(), inverse(names))
+            solutions = [replay(problem, steps)]
+        return {'visited': visited, 'solutions': solutions}
+
+    def put(self, problem, algorithm, results, cost_model=None,
+            model='step'):
+        """Store the first solution and the visited count of results,
+        unless algorithm is in UNCACHED."""
+        if algorithm in UNCACHED:
+            return
+        board, names = canonical(problem)
+        key = self._key(board, algorithm, cost_model, model)
+        if results['solutions']:
+            steps = solution_steps(results['solutions'][0])
+            moves = ' '.join(rename_steps(steps, names))
+        else:
+            moves = NO_SOLUTION
+        value = (moves, results['visited'])
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                key + value + (time.time(),))
+            count, = self.connection.execute(
+                'SELECT COUNT(*) FROM solutions').fetchone()
+            if count > self.capacity:
+                self.connection.execute(
+                    'DELETE FROM solutions WHERE rowid IN (SELECT rowid'
+                    ' FROM solutions ORDER BY used LIMIT ?)',
+                    (count - self.capacity,))
+        self._remember(key, value)
+
+    def __len__(self):
+        count, = self.connection.execute(
+            'SELECT COUNT(*) FROM solutions').fetchone()
+        return count
+
+
+if __name__ == '__main__':
+    filename = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    with SolutionCache(filename) as cache:
+        rows = cache.connection.execute(
+            'SELECT board, algorithm, cost_model, moves, visited'
+            ' FROM solutions WHERE schema = ? ORDER BY used DESC', (SCHEMA,))
+        for board, algorithm, cost_model, moves, visited in rows:
+            moves = 'no solution' if moves is None else moves
+            print(board, algorithm, cost_model, visited, moves, sep='\t')
@@ -0,0 +1,142 @@
+"""
+Closed lists for the solvers: the set of boards already expanded.
+
+A closed list only needs membership tests and insertion, so instead of
+keeping whole Problem objects it keeps their packed state codes. Both
+kinds below support `board in closed`, `closed.add(board)` and
+`len(closed)`, like a set of boards, and either can be passed to the
+solvers as their closed keyword.
+
+ClosedList is exact. BloomFilter uses a fixed amount of memory whatever
+the number of boards, but may answer that a new board was already seen:
+with m bits, k hashes and n boards added, that happens with probability
+about (1 - e^(-k*n/m))^k. Such a board is never expanded, so a search may
+then miss the optimal solution, or every solution. Size it for the
+expected number of boards: 10 bits per board with 7 hashes gives about
+1% false positives, 20 bits per board with 14 hashes about 0.01%.
+"""
+import math
+from array import array
+
+SPREAD = 0x9E3779B97F4A7C15
+"""Odd 64 bit multiplier that spreads state codes over the table slots."""
+
+
+class ClosedList(object):
+    """
+    Exact set of boards, stored as packed state codes in an open-addressing
+    table of 64 bit slots with linear probing. The table doubles when it
+    gets half full, so a board costs 16 to 32 bytes. State codes must fit
+    in 63 bits, that is boards of up to 21 vehicles on the classic board;
+    the solvers fall back to a set of boards for larger ones.
+    """
+
+    def __init__(self, capacity=1 << 10):
+        """Create an empty closed list sized for capacity boards."""
+        size = 1 << max(2 * capacity - 1, 1).bit_length()
+        self.slots = array('Q', bytes(8 * size))   # code + 1, 0 when empty
+        self.mask = size - 1
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, state):
+        slots = self.slots
+        mask = self.mask
+        target = state.code + 1
+        slot = (target * SPREAD >> 32) & mask
+        while True:
+            stored = slots[slot]
+            if stored == target:
+                return True
+            if not stored:
+                return False
+            slot = (slot + 1) & mask
+
+    def add(self, state):
+        """Add a board; return False if it was already in the list."""
+        slots = self.slots
+        mask = self.mask
+        target = state.code + 1
+        slot = (target * SPREAD >> 32) & mask
+        while True:
+            stored = slots[slot]
+            if stored == target:
+                return False
+            if not stored:
+                break
+            slot = (slot + 1) & mask
+        slots[slot] = target
+        self.count += 1
+        if 2 * self.count > mask:
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self.slots
+        size = 2 * len(old)
+        slots = array('Q', bytes(8 * size))
+        mask = size - 1
+        for stored in old:
+            if stored:
+                slot = (stored * SPREAD >> 32) & mask
+                while slots[slot]:
+                    slot = (slot + 1) & mask
+                slots[slot] = stored
+        self.slots = slots
+        self.mask = mask
+
+
+class BloomFilter(object):
+    """
+    Approximate set of boards in a fixed bit array; see the module
+    docstring for the false positive rate. len() counts the boards that
+    were added as new, so it can fall short of the true number.
+    """
+
+    def __init__(self, bits=1 << 23, hashes=7):
+        """Create an empty filter of bits bits (1 MB by default), testing
+        hashes bits per board."""
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_capacity(cls, capacity, error=0.01):
+        """A filter sized for capacity boards at the given false positive
+        rate."""
+        bits = max(int(-capacity * math.log(error) / math.log(2) ** 2), 8)
+        hashes = max(round(bits / capacity * math.log(2)), 1)
+        return cls(bits, hashes)
+
+    def _positions(self, state):
+        # Double hashing from the two halves of the 64 bit Zobrist key
+        key = state.key
+        first = key & 0xFFFFFFFF
+        step = (key >> 32) | 1
+        bits = self.bits
+        return [(first + i * step) % bits for i in range(self.hashes)]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, state):
+        bit_array = self.array
+        return all(bit_array[bit >> 3] & (1 << (bit & 7))
+                   for bit in self._positions(state))
+
+    def add(self, state):
+        """Add a board; return False if it seemed to be there already."""
+        bit_array = self.array
+        new = False
+        for bit in self._positions(state):
+            byte = bit >> 3
+            flag = 1 << (bit & 7)
+            if not bit_array[byte] & flag:
+                bit_array[byte] |= flag
+                new = True
+        if new:
+            self.count += 1
+        return new
@@ -0,0 +1,162 @@
+import pickle
+import sys
+import time
+from collections import deque
+
+from problem import Geometry, Layout, load_file, solution_steps
+from solver import BucketQueue, Node
+from solver import COSTS as SOLVER_COSTS
+from vehicle import Vehicle
+
+
+COSTS = {name: SOLVER_COSTS[name] for name in ('unit', 'length')}
+"""Cost models of the table: 'unit' counts moves (bfs), 'length' charges
+the length of the moved vehicle (ucs and a_star_solver). Moves are one
+cell, so solver.COSTS['cells'] would equal 'unit'."""
+
+
+class DistanceTable(object):
+    """Exact distance to the goal of every state in a board's component.
+
+    The table is built once by retrograde analysis: the connected component
+    of the start board is enumerated, then one sweep per cost model runs
+    backward from all of its goal states at the same time. Afterwards any
+    state of the component gets its distance and an optimal next move from
+    dictionary lookups instead of a new search.
+    """
+
+    def __init__(self, layout, size, distances):
+        """Create a table from precomputed distances.
+
+        Arguments:
+            layout: the Layout the state codes belong to.
+            size: the number of states in the component.
+            distances: dict of cost model name -> {state code: distance}.
+        """
+        self.layout = layout
+        self.size = size
+        self.distances = distances
+
+    @classmethod
+    def build(cls, problem):
+        """Enumerate the component of a Problem and compute its distances."""
+        # Every move can be undone, so the states reachable from the start
+        # are exactly the states that can reach it.
+        seen = {problem}
+        goals = []
+        queue = deque([problem])
+        while queue:
+            board = queue.popleft()
+            if board.solved():
+                goals.append(board)
+            for move in board.moves():
+                if move not in seen:
+                    seen.add(move)
+                    queue.append(move)
+
+        distances = dict()
+        for name, cost in COSTS.items():
+            sweep = _sweep(goals, cost)
+            distances[name] = {board.code: d for board, d in sweep.items()}
+        return cls(problem.layout, len(seen), distances)
+
+    def _check(self, problem):
+        if problem.layout != self.layout:
+            raise ValueError('Board does not belong to this table')
+
+    def distance(self, problem, cost='length'):
+        """Optimal cost from problem to a goal, or None if there is none."""
+        self._check(problem)
+        return self.distances[cost].get(problem.code)
+
+    def next_move(self, problem, cost='length'):
+        """Return an optimal (move, board) pair for problem.
+
+        Returns None when problem is solved or no goal can be reached.
+        """
+        table = self.distances[cost]
+        d = self.distance(problem, cost)
+        if not d:
+            return None
+        for step, move in problem.successors():
+            if table.get(move.code) == d - COSTS[cost](self.layout, step):
+                return step, move
+
+    def solution(self, problem, cost='length'):
+        """Optimal solution path from problem as a tuple of Nodes.
+
+        The path is empty when no goal can be reached.
+        """
+        if self.distance(problem, cost) is None:
+            return tuple()
+        node = Node(problem)
+        while True:
+            found = self.next_move(node.state, cost)
+            if found is None:
+                return node.path()
+            step, move = found
+            node = Node(move, node, step)
+
+    def save(self, filename):
+        """Write the table to a file that load() can read back."""
+        data = {'signature': self.layout.signature,
+                'size': self.size,
+                'distances': self.distances}
+        with open(filename, 'wb') as table_file:
+            pickle.dump(data, table_file, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """Read a table written by save()."""
+        with open(filename, 'rb') as table_file:
+            data = pickle.load(table_file)
+        ids, orientations, lanes, lengths, geometry = data['signature']
+        layout = Layout((Vehicle(vid, 0, lane, o, length) if o == 'H'
+                         else Vehicle(vid, lane, 0, o, length)
+                         for vid, o, lane, length
+                         in zip(ids, orientations, lanes, lengths)),
+                        Geometry(*geometry))
+        return cls(layout, data['size'], data['distances'])
+
+
+def _sweep(goals, cost):
+    """Distances to the nearest goal, by uniform cost search from all goals.
+
+    A move costs the same in both directions, so searching forward from the
+    goals gives the backward distances.
+    """
+    distance = dict()
+    queue = BucketQueue()
+    for board in goals:
+        queue.push(0, 0, board)
+    while queue:
+        d, _, board = queue.pop()
+        if board in distance:
+            continue
+        distance[board] = d
+        for step, move in board.successors():
+            if move not in distance:
+                new_d = d + cost(board.layout, step)
+                queue.push(new_d, new_d, move)
+    return distance
+
+
+if __name__ == '__main__':
+    """syntax: python distances.py Map/map_01.txt [table.pkl]"""
+    filename = sys.argv[1]
+    with open(filename) as rushhour_file:
+        problem = load_file(rushhour_file)
+
+    start_time = time.time()
+    table = DistanceTable.build(problem)
+    end_time = time.time()
+
+    print(f"{table.size} States in component")
+    print(f"{len(table.distances['unit'])} States can reach the goal")
+    for cost in COSTS:
+        print(f"Distance ({cost}): {table.distance(problem, cost)}")
+    print('Solution:', ', '.join(solution_steps(table.solution(problem))))
+    print(f"Time taken: {end_time - start_time:.4f} seconds")
+
+    if len(sys.argv) > 2:
+        table.save(sys.argv[2])
@@ -0,0 +1,229 @@
+"""
+Proofs that a board cannot be solved, found before any search.
+
+precheck() is a structural test that takes microseconds. A vehicle never
+leaves its lane and never passes the other vehicles of its lane, so each
+vehicle can only ever reach a range of positions; a cell that a vehicle
+covers at every position of its range is a wall for the vehicles of the
+other lanes, like the walls of the board, which narrows their ranges in
+turn. The ranges are narrowed
+until nothing changes. If the goal vehicle's range then stops short of
+the exit, no sequence of moves can solve the board: for example a
+horizontal vehicle right of X in its row, or a vertical one across that
+row that its lane neighbours or other pinned vehicles keep in place.
+
+The test is sound but not complete. When it finds nothing, component()
+walks the whole component of the board over packed state codes, keeping
+one set of integers and no paths, and either reaches a goal or proves
+that none can be reached. check() runs both.
+
+syntax: python feasibility.py Map/map_17.txt [Map/map_18.txt ...]
+                             [--no-enumerate]
+"""
+import argparse
+import sys
+import time
+
+from problem import load_file
+from solver import _code_moves
+
+
+def ranges(problem):
+    """Positions each vehicle of problem can ever reach, as a list of
+    (lowest, highest) pairs in the layout's vehicle order; see the module
+    docstring."""
+    layout = problem.layout
+    masks = layout.masks
+    lengths = layout.lengths
+    positions = problem.positions
+    count = len(positions)
+    low = [0] * count
+    high = [len(masks[i]) - 1 for i in range(count)]
+
+    # The vehicles before and after each one in its lane
+    lanes = dict()
+    for i in range(count):
+        lanes.setdefault((layout.orientations[i], layout.lanes[i]),
+                         []).append(i)
+    lane_of = [None] * count
+    neighbours = []
+    for lane, members in lanes.items():
+        members.sort(key=lambda i: positions[i])
+        for k, i in enumerate(members):
+            lane_of[i] = lane
+            neighbours.append((i,
+                               members[k - 1] if k > 0 else None,
+                               members[k + 1] if k + 1 < len(members)
+                               else None))
+
+    changed = True
+    while changed:
+        changed = False
+        # Cells each vehicle covers at every position of its range
+        pinned = []
+        for i in range(count):
+            cells = masks[i][low[i]]
+            for p in range(low[i] + 1, high[i] + 1):
+                cells &= masks[i][p]
+            pinned.append(cells)
+        for i, previous, following in neighbours:
+            walls = layout.walls
+            for j in range(count):
+                if lane_of[j] != lane_of[i]:
+                    walls |= pinned[j]
+            lowest, highest = low[i], high[i]
+            if previous is not None:
+                lowest = max(lowest, low[previous] + lengths[previous])
+            if following is not None:
+                highest = min(highest, high[following] - lengths[i])
+            # Walls cut the range to the free positions around the start
+            p = positions[i]
+            q = p
+            while q > lowest and not masks[i][q - 1] & walls:
+                q -= 1
+            lowest = q
+            q = p
+            while q < highest and not masks[i][q + 1] & walls:
+                q += 1
+            highest = q
+            if (lowest, highest) != (low[i], high[i]):
+                low[i], high[i] = lowest, highest
+                changed = True
+    return list(zip(low, high))
+
+
+def precheck(problem):
+    """Reason why problem provably cannot be solved, or None when the
+    structural test finds none."""
+    layout = problem.layout
+    goal = layout.goal
+    if goal is None:
+        return 'no goal vehicle X along the lane of the exit'
+    if problem.solved():
+        return None
+    reach = ranges(problem)
+    # Exits on the right or bottom are at the high end of the lane of X
+    forward = layout.goal_position > 0
+    low, high = reach[goal]
+    if (high if forward else low) == layout.goal_position:
+        return None
+    for i in range(len(reach)):
+        if (layout.orientations[i] == layout.orientations[goal] and
+                i != goal and layout.lanes[i] == layout.lanes[goal] and
+                (problem.positions[i] > problem.positions[goal]) == forward):
+            if forward and layout.orientations[goal] == 'H':
+                return '{0} is right of X in its row'.format(layout.ids[i])
+            return '{0} is between X and the exit in its lane'.format(
+                layout.ids[i])
+    # Name the vehicle that stops X: whoever covers the next cell for good
+    end, ahead = (high, high + 1) if forward else (low, low - 1)
+    blocked = layout.masks[goal][ahead] & ~layout.masks[goal][end]
+    if blocked & layout.walls:
+        return 'a wall is in the path of X to the exit'
+    for i, (first, last) in enumerate(reach):
+        cells = layout.masks[i][first]
+        for p in range(first + 1, last + 1):
+            cells &= layout.masks[i][p]
+        if i != goal and cells & blocked:
+            return '{0} can never leave the path of X to the exit'.format(
+                layout.ids[i])
+    return 'X can never reach the exit'
+
+
+def component(problem, limit=None, budget=None):
+    """
+    Walk the component of problem until a goal state is found.
+    Returns (solvable, states): whether a goal was reached and how many
+    states were seen, the whole component when solvable is False.
+    solvable is None when limit states were seen first.
+
+    Keyword Arguments:
+        limit: most states to look at (default=None, no limit)
+        budget: a stats.Budget whose limits are checked every 1024 states,
+            without counting them as expansions (default=None)
+
+    Exceptions:
+        stats.BudgetExhausted: when a limit of budget is reached
+    """
+    layout = problem.layout
+    goal = layout.goal
+    if goal is None:
+        return False, 1
+    moves = _code_moves(layout, False)
+    shifts = tuple(enumerate(layout.shifts))
+    position_mask = layout.position_mask
+    goal_shift = layout.shifts[goal]
+    goal_position = layout.goal_position
+
+    start = problem.code
+    seen = {start}
+    stack = [(start, problem.occupied)]
+    walked = 0
+    while stack:
+        code, occupied = stack.pop()
+        walked += 1
+        if budget is not None and walked % 1024 == 0:
+            budget.check(len(stack))
+        if (code >> goal_shift) & position_mask == goal_position:
+            return True, len(seen)
+        for i, shift in shifts:
+            for run in moves[i][(code >> shift) & position_mask]:
+                for _, free, flip, code_flip in run:
+                    if occupied & free:
+                        break
+                    child = code ^ code_flip
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append((child, occupied ^ flip))
+        if limit is not None and len(seen) >= limit:
+            return None, len(seen)
+    return False, len(seen)
+
+
+def check(problem, exhaustive=True, limit=None, budget=None):
+    """
+    Decide whether problem can be solved. Returns a dictionary with:
+        'solvable': True, False, or None when unknown
+        'reason': why it cannot be solved, or None
+        'states': number of states enumerated (0 when the precheck decided)
+
+    Keyword Arguments:
+        exhaustive: enumerate the component when the precheck finds
+            nothing (default=True)
+        limit: most states to enumerate, see component() (default=None)
+        budget: a stats.Budget for the enumeration, see component()
+            (default=None)
+
+    Exceptions:
+        stats.BudgetExhausted: when a limit of budget is reached
+    """
+    reason = precheck(problem)
+    if reason is not None:
+        return {'solvable': False, 'reason': reason, 'states': 0}
+    if not exhaustive:
+        return {'solvable': None, 'reason': None, 'states': 0}
+    solvable, states = component(problem, limit, budget)
+    if solvable is False:
+        reason = 'no goal among the {0} reachable states'.format(states)
+    return {'solvable': solvable, 'reason': reason, 'states': states}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prove maps unsolvable.')
+    parser.add_argument('maps', nargs='+')
+    parser.add_argument('--no-enumerate', action='store_true',
+                        help='only run the structural precheck')
+    args = parser.parse_args()
+
+    for filename in args.maps:
+        with open(filename) as rushhour_file:
+            problem = load_file(rushhour_file)
+        start_time = time.time()
+        result = check(problem, exhaustive=not args.no_enumerate)
+        elapsed = time.time() - start_time
+        verdict = {True: 'solvable', False: 'unsolvable',
+                   None: 'unknown'}[result['solvable']]
+        print(f"{filename}: {verdict}"
+              f"{' (' + result['reason'] + ')' if result['reason'] else ''}"
+              f" in {elapsed * 1e6:.0f} us")
+    sys.exit(0)
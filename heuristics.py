@@ -0,0 +1,257 @@
+"""
+Admissible heuristics for a_star_solver under the vehicle-length cost
+model: a move costs the length of the vehicle that moves. Each one takes a
+Problem and returns a lower bound on the cost to the goal, or float('inf')
+when the goal provably cannot be reached.
+
+syntax: python heuristics.py Map/map_01.txt [Map/map_02.txt ...]
+"""
+import hashlib
+import itertools
+import os
+import pickle
+import sys
+import time
+
+from distances import _sweep
+from problem import Layout, POSITION_BITS, load_file
+from solver import a_star_solver, heuristic
+
+INF = float('inf')
+
+
+def _placed(state):
+    """List of (index, cells) for every vehicle on the board."""
+    masks = state.layout.masks
+    return [(i, masks[i][p]) for i, p in enumerate(state.positions)]
+
+
+def blocker_count(state):
+    """
+    Cost of moving X to the exit plus one move of every vehicle between X
+    and the exit.
+    """
+    layout = state.layout
+    goal = layout.goal
+    if goal is None:
+        return INF  # X not found
+    x = state.positions[goal]
+    exit_mask = layout.exit_masks[x]
+    h = abs(layout.goal_position - x) * layout.lengths[goal]
+    if not state.occupied & exit_mask:
+        return h
+    for i, cells in _placed(state):
+        if cells & exit_mask:
+            if layout.orientations[i] == layout.orientations[goal]:
+                return INF  # Can never leave the lane of X
+            h += layout.lengths[i]
+    return h
+
+
+def _clearing_options(state, i, row, placed):
+    """
+    Ways for vehicle i, across the lane of X, to clear row, the lane of X,
+    as (cost of the slides of i, set of vehicles in its way) pairs.
+    """
+    layout = state.layout
+    masks = layout.masks[i]
+    p = state.positions[i]
+    length = layout.lengths[i]
+    options = []
+    for target in (row - length, row + 1):   # Above or below the row
+        if not 0 <= target < len(masks):
+            continue
+        step = 1 if target > p else -1
+        path = 0
+        for q in range(p + step, target + step, step):
+            path |= masks[q]
+        path &= ~masks[p]
+        in_way = frozenset(j for j, cells in placed if cells & path)
+        options.append((abs(target - p) * length, in_way))
+    return options
+
+
+def recursive_blockers(state):
+    """
+    Like blocker_count, but every blocker pays for the cells it must slide
+    to clear the row of X, going up or down, and every vehicle in its way
+    must move once. The cheapest combination of directions is taken, so a
+    vehicle in the way of several blockers is only counted once.
+    """
+    layout = state.layout
+    goal = layout.goal
+    if goal is None:
+        return INF  # X not found
+    x = state.positions[goal]
+    exit_mask = layout.exit_masks[x]
+    h = abs(layout.goal_position - x) * layout.lengths[goal]
+    if not state.occupied & exit_mask:
+        return h
+
+    placed = _placed(state)
+    row = layout.lanes[goal]
+    choices = []
+    for i, cells in placed:
+        if cells & exit_mask:
+            if layout.orientations[i] == layout.orientations[goal]:
+                return INF  # Can never leave the lane of X
+            options = _clearing_options(state, i, row, placed)
+            if not options:
+                return INF
+            choices.append(options)
+
+    best = INF
+    for combination in itertools.product(*choices):
+        cost = sum(slide for slide, _ in combination)
+        in_way = frozenset().union(*(vehicles for _, vehicles in combination))
+        cost += sum(layout.lengths[j] for j in in_way)
+        best = min(best, cost)
+    return h + best
+
+
+class PatternDatabase(object):
+    """
+    Additive pattern database for a single board layout.
+
+    The vehicles other than X are split into groups. For each group, the
+    exact cost to the goal is precomputed on an abstract board that holds
+    only X and that group, counting only the moves of the group (and, for
+    the first group, of X). Removing vehicles never makes the puzzle harder
+    and every real move is counted by at most one group, so the sum of the
+    group costs is admissible.
+    """
+
+    def __init__(self, signature, groups, tables, position_bits=POSITION_BITS):
+        """Create a database from precomputed tables.
+
+        Arguments:
+            signature: the signature of the Layout it was built for.
+            groups: tuple of tuples of vehicle indices, X included.
+            tables: one {abstract state code: cost} dict per group.
+
+        Keyword Arguments:
+            position_bits: bits per position in the abstract state codes,
+                the position_bits of the Layout (default=POSITION_BITS)
+        """
+        self.signature = signature
+        self.groups = groups
+        self.tables = tables
+        self.position_bits = position_bits
+        # Where each vehicle's position goes in the abstract state code
+        self.shifts = tuple(
+            tuple((i, k * position_bits) for k, i in enumerate(group))
+            for group in groups)
+
+    @classmethod
+    def build(cls, problem, group_size=4):
+        """Precompute the database for the layout of a Problem."""
+        layout = problem.layout
+        goal = layout.goal
+        if goal is None:
+            raise ValueError('Board has no goal vehicle')
+        others = [i for i in range(len(layout.ids)) if i != goal]
+        groups = []
+        tables = []
+        for start in range(0, max(len(others), 1), group_size):
+            members = sorted([goal] + others[start:start + group_size])
+            pays_x = start == 0
+            groups.append(tuple(members))
+            tables.append(_abstract_costs(layout, members, pays_x))
+        return cls(layout.signature, tuple(groups), tuple(tables),
+                   layout.position_bits)
+
+    def __call__(self, state):
+        positions = state.positions
+        h = 0
+        for shifts, table in zip(self.shifts, self.tables):
+            code = 0
+            for i, shift in shifts:
+                code |= positions[i] << shift
+            h += table.get(code, INF)
+        return h
+
+    def save(self, filename):
+        """Write the database to a file that load() can read back."""
+        data = {'signature': self.signature,
+                'groups': self.groups,
+                'tables': self.tables,
+                'position_bits': self.position_bits}
+        with open(filename, 'wb') as pdb_file:
+            pickle.dump(data, pdb_file, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """Read a database written by save()."""
+        with open(filename, 'rb') as pdb_file:
+            data = pickle.load(pdb_file)
+        return cls(data['signature'], data['groups'], data['tables'],
+                   data.get('position_bits', POSITION_BITS))
+
+    @classmethod
+    def cached(cls, problem, directory, group_size=4):
+        """Load the database of a Problem from directory, building and
+        saving it there first if needed."""
+        name = repr((problem.layout.signature, group_size)).encode()
+        filename = os.path.join(
+            directory, 'pdb-{0}.pkl'.format(hashlib.sha1(name).hexdigest()))
+        if os.path.exists(filename):
+            return cls.load(filename)
+        pdb = cls.build(problem, group_size)
+        os.makedirs(directory, exist_ok=True)
+        pdb.save(filename)
+        return pdb
+
+
+def _abstract_costs(layout, members, pays_x):
+    """Cost to the goal of every state of the board that only holds the
+    vehicles in members, counting only the moves of non-X vehicles (and of
+    X if pays_x)."""
+    sub = Layout((layout.vehicle(i, 0) for i in members), layout.geometry)
+    goals = []
+    ranges = [range(len(masks)) for masks in sub.masks]
+    ranges[sub.goal] = [sub.goal_position]
+    for positions in itertools.product(*ranges):
+        occupied = sub.walls
+        for i, p in enumerate(positions):
+            if occupied & sub.masks[i][p]:
+                break
+            occupied |= sub.masks[i][p]
+        else:
+            goals.append(sub.state(positions))
+
+    def cost(sub, move):
+        if move[0] == 'X' and not pays_x:
+            return 0
+        return sub.length_of[move[0]]
+
+    return {board.code: d for board, d in _sweep(goals, cost).items()}
+
+
+HEURISTICS = {
+    'cells': heuristic,
+    'blockers': blocker_count,
+    'recursive': recursive_blockers,
+}
+"""Heuristics that need no precomputation, by name."""
+
+
+if __name__ == '__main__':
+    names = list(HEURISTICS) + ['pdb']
+    print('map', *names, sep='\t')
+    for filename in sys.argv[1:]:
+        with open(filename) as rushhour_file:
+            problem = load_file(rushhour_file)
+        row = [os.path.basename(filename)]
+        for name in names:
+            if name == 'pdb':
+                if problem.layout.goal is None:
+                    row.append('-')
+                    continue
+                h = PatternDatabase.build(problem)
+            else:
+                h = HEURISTICS[name]
+            start_time = time.time()
+            results = a_star_solver(problem, heuristic=h)
+            end_time = time.time()
+            row.append(f"{results['visited']} ({end_time - start_time:.3f}s)")
+        print(*row, sep='\t')
@@ -1,9 +1,15 @@
 import pygame
 import os
+import inspect
+import threading
 import time
-from vehicle import Vehicle
-from problem import Problem
-from solver import bfs, dfs, ucs, a_star_solver
+from functools import partial
+from problem import load_file, solution_cost
+from solver import (bfs, dfs, ucs, a_star_solver, ida_star, anytime_a_star,
+                    beam_search)
+from stats import Budget, SearchCancelled
+from cache import SolutionCache
+from feasibility import check, precheck
 
 pygame.init()
 click_sound = pygame.mixer.Sound("assets/click.wav")
@@ -32,9 +38,19 @@ id_colors = {}
 
 # Game state
 maps = sorted([f for f in os.listdir("Map") if f.endswith(".txt")])
-solvers = ["A*", "UCS", "BFS", "DFS"]
+solvers = ["A*", "UCS", "BFS", "DFS", "IDA*", "AWA*", "Beam"]
+solver_functions = {"A*": a_star_solver, "UCS": ucs, "BFS": bfs,
+                    "DFS": dfs, "IDA*": ida_star,
+                    # Quick answers: within twice the optimum, improved
+                    # for at most a second; or a fixed-width beam
+                    "AWA*": partial(anytime_a_star, weight=2, deadline=1.0),
+                    "Beam": partial(beam_search, width=64)}
+length_solvers = ["A*", "UCS", "IDA*", "AWA*", "Beam"]  # Cost: cells x length
+move_models = ["Step", "Slide"]  # One cell per move, or any distance
+sliding_solvers = ["A*", "UCS", "BFS", "AWA*", "Beam"]  # Take the Slide model
 map_idx = 0
 solver_idx = 0
+model_idx = 0
 problem = None
 solution = []
 current_step = 0
@@ -42,6 +58,65 @@ playing = False
 last_play_time = 0
 screen_state = "home"  # Only home & play now
 no_solution_found = False
+solve_error = None  # Message of the last search that failed, if any
+worker = None  # SolveWorker of the running search, if any
+solution_cache = SolutionCache()
+
+
+def cacheable(search):
+    """False for a solver run with options other than its defaults, such
+    as the deadline of AWA*: cache entries do not record them, so its
+    results, maybe cut short, would be read back for untuned runs."""
+    if not isinstance(search, partial):
+        return True
+    defaults = inspect.signature(search.func).parameters
+    return all(defaults[name].default == value
+               for name, value in search.keywords.items())
+
+
+class SolveWorker(threading.Thread):
+    """Runs one search in the background so the window keeps responding.
+
+    The search runs within a Budget that shares the cancelled event as its
+    token, so cancel() stops it at its next expansion. The render loop
+    reads the live counts from stats and picks up the result once done is
+    set. Boards whose component holds no goal are found by enumerating it
+    first, without searching; the enumeration polls the same token, so
+    cancel() stops it too. When the search fails, result holds no
+    solutions and the message under 'error'.
+    """
+
+    def __init__(self, algorithm, problem, model="step"):
+        super().__init__(daemon=True)
+        self.algorithm = algorithm
+        self.search = solver_functions[algorithm]
+        self.cacheable = cacheable(self.search)
+        self.problem = problem
+        self.model = model if algorithm in sliding_solvers else "step"
+        self.options = {"model": self.model} if self.model != "step" else {}
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.stats = Budget(token=self.cancelled)
+        self.result = None
+
+    def run(self):
+        try:
+            if check(self.problem, budget=self.stats)['solvable'] is False:
+                self.result = {'visited': 0, 'solutions': [],
+                               'depth_states': {}}
+            else:
+                self.result = self.search(self.problem, stats=self.stats,
+                                          **self.options)
+        except SearchCancelled:
+            pass
+        except Exception as e:
+            self.result = {'visited': 0, 'solutions': [], 'depth_states': {},
+                           'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self.done.set()
+
+    def cancel(self):
+        self.cancelled.set()
 
 
 def draw_home_screen():
@@ -82,16 +157,19 @@ def draw_home_screen():
 
 
 def draw_board(state):
-    # Draw the background grid (6x6)
-    for y in range(6):
-        for x in range(6):
+    # Draw the background grid, with cells shrunk to fit larger boards
+    geometry = state.layout.geometry
+    cell = min(CELL, 480 // max(geometry.width, geometry.height))
+    for y in range(geometry.height):
+        for x in range(geometry.width):
             cell_rect = pygame.Rect(
-                GRID_ORIGIN[0] + x * CELL,
-                GRID_ORIGIN[1] + y * CELL,
-                CELL,
-                CELL
+                GRID_ORIGIN[0] + x * cell,
+                GRID_ORIGIN[1] + y * cell,
+                cell,
+                cell
             )
-            pygame.draw.rect(screen, (220, 220, 220), cell_rect)  # Cell fill
+            fill = (90, 90, 90) if (x, y) in geometry.walls else (220, 220, 220)
+            pygame.draw.rect(screen, fill, cell_rect)             # Cell fill
             pygame.draw.rect(screen, BLACK, cell_rect, 1)         # Cell border
 
     # Draw all vehicles (one ID each, centered, rounded corners)
@@ -102,12 +180,12 @@ def draw_board(state):
         drawn_ids.add(vehicle.id)
 
         x, y = vehicle.x, vehicle.y
-        width = CELL * vehicle.length if vehicle.orientation == 'H' else CELL
-        height = CELL if vehicle.orientation == 'H' else CELL * vehicle.length
+        width = cell * vehicle.length if vehicle.orientation == 'H' else cell
+        height = cell if vehicle.orientation == 'H' else cell * vehicle.length
 
         vehicle_rect = pygame.Rect(
-            GRID_ORIGIN[0] + x * CELL,
-            GRID_ORIGIN[1] + y * CELL,
+            GRID_ORIGIN[0] + x * cell,
+            GRID_ORIGIN[1] + y * cell,
             width,
             height
         )
@@ -125,25 +203,31 @@ def draw_board(state):
         label = font.render(vehicle.id, True, BLACK)
         screen.blit(label, label.get_rect(center=vehicle_rect.center))
 
-    # Draw EXIT arrow
-    exit_arrow = [
-        (GRID_ORIGIN[0] + 6 * CELL + 10, GRID_ORIGIN[1] + 2 * CELL + 20),
-        (GRID_ORIGIN[0] + 6 * CELL + 30, GRID_ORIGIN[1] + 2 * CELL + 30),
-        (GRID_ORIGIN[0] + 6 * CELL + 10, GRID_ORIGIN[1] + 2 * CELL + 40)
-    ]
-    pygame.draw.polygon(screen, RED, exit_arrow)
-    screen.blit(
-        font.render("EXIT", True, RED),
-        (GRID_ORIGIN[0] + 6 * CELL + 35, GRID_ORIGIN[1] + 2 * CELL + 20)
-    )
-
-    # Draw a gate at the right edge of row 2 (where the red car exits)
-    gate_rect = pygame.Rect(
-        GRID_ORIGIN[0] + 6 * CELL - 4,
-        GRID_ORIGIN[1] + 2 * CELL + 4,
-        8,
-        CELL - 8
-    )
+    # The exit: its side and lane, by default the right end of the row of X
+    layout = state.layout
+    side, lane = geometry.exit or ('R', None)
+    if lane is None:
+        lane = layout.lanes[layout.goal] if layout.goal is not None else 2
+    right = GRID_ORIGIN[0] + geometry.width * cell
+    bottom = GRID_ORIGIN[1] + geometry.height * cell
+    if side == 'R':
+        # Draw EXIT arrow
+        top = GRID_ORIGIN[1] + lane * cell
+        exit_arrow = [
+            (right + 10, top + cell // 2 - 10),
+            (right + 30, top + cell // 2),
+            (right + 10, top + cell // 2 + 10)
+        ]
+        pygame.draw.polygon(screen, RED, exit_arrow)
+        screen.blit(font.render("EXIT", True, RED), (right + 35, top + cell // 2 - 10))
+
+    # Draw a gate at the edge of the board where the red car exits
+    along = GRID_ORIGIN[1 if side in 'LR' else 0] + lane * cell + 4
+    edge = {'R': right, 'L': GRID_ORIGIN[0], 'D': bottom, 'U': GRID_ORIGIN[1]}[side] - 4
+    if side in 'LR':
+        gate_rect = pygame.Rect(edge, along, 8, cell - 8)
+    else:
+        gate_rect = pygame.Rect(along, edge, cell - 8, 8)
     pygame.draw.rect(screen, (150, 0, 0), gate_rect, border_radius=3)
     pygame.draw.rect(screen, BLACK, gate_rect, 1, border_radius=3)
 
@@ -189,10 +273,19 @@ def draw_game_ui():
     screen.blit(font.render("<", True, BLACK), (95, 102))
     screen.blit(font.render(">", True, BLACK), (195, 102))
     screen.blit(font.render(solvers[solver_idx], True, BLACK), (110, 102))
-    pygame.draw.line(screen, GRAY, (30, 135), (200, 135), 2)
+
+    # Move model selector
+    screen.blit(font.render("Moves:", True, BLACK), (30, 130))
+    pygame.draw.rect(screen, GRAY, (110, 130, 92, 25))
+    pygame.draw.rect(screen, (180, 180, 180), (90, 130, 20, 25))
+    pygame.draw.rect(screen, (180, 180, 180), (193, 130, 20, 25))
+    screen.blit(font.render("<", True, BLACK), (95, 132))
+    screen.blit(font.render(">", True, BLACK), (195, 132))
+    screen.blit(font.render(move_models[model_idx], True, BLACK), (110, 132))
+    pygame.draw.line(screen, GRAY, (30, 162), (200, 162), 2)
 
     # Rounded Action Buttons (Solve, Play, Reset, Return)
-    button_labels = ["Solve", "Play/Stop", "Reset", "Return"]
+    button_labels = ["Cancel" if worker else "Solve", "Play/Stop", "Reset", "Return"]
     button_colors = [(140, 220, 140), (140, 200, 255), (255, 200, 120), (255, 140, 140)]
     for i, label in enumerate(button_labels):
         btn_rect = pygame.Rect(50, 170 + i * 60, 120, 40)
@@ -206,20 +299,24 @@ def draw_game_ui():
     pygame.draw.rect(screen, WHITE, (30, y_base, 160, 100))
     pygame.draw.rect(screen, BLACK, (30, y_base, 160, 100), 1)
 
-    if solution:
+    if worker:
+        # Live progress of the running search
+        stats = worker.stats
+        screen.blit(font.render("Solving...", True, BLACK), (40, y_base + 5))
+        screen.blit(font.render(f"Nodes: {stats.expanded}", True, BLACK), (40, y_base + 25))
+        screen.blit(font.render(f"Time: {stats.elapsed:.1f}s", True, BLACK), (40, y_base + 45))
+        if stats.best:
+            screen.blit(font.render(f"Best: {len(stats.best)-1} moves", True, BLACK), (40, y_base + 65))
+
+    elif solution:
         step_text = f"Step: {current_step}/{len(solution)-1}"
 
         def compute_cost(method):
-            cost = 0
-            for i in range(method):
-                moved = list(solution[i].vehicles - solution[i + 1].vehicles)
-                if moved:
-                    v = moved[0]
-                    if solvers[solver_idx] in ["UCS", "A*"]:
-                        cost += v.length  # Method 2: multiply by vehicle length
-                    else:
-                        cost += 1         # Method 1: each move = 1
-            return cost
+            if solvers[solver_idx] in length_solvers:
+                # Method 2: cells moved times vehicle length
+                return solution_cost(solution[:method + 1], "length")
+            # Method 1: each move = 1
+            return solution_cost(solution[:method + 1], "unit")
 
         current_cost = compute_cost(current_step)
         total_cost = compute_cost(len(solution) - 1)
@@ -238,37 +335,64 @@ def draw_game_ui():
     if no_solution_found:
         pygame.draw.rect(screen, (255, 240, 240), (30, 520, 160, 50), border_radius=8)
         pygame.draw.rect(screen, (200, 0, 0), (30, 520, 160, 50), width=2, border_radius=8)
-        screen.blit(font.render("No solution found", True, (200, 0, 0)), (40, 535))
+        message = "Solver failed" if solve_error else "No solution found"
+        screen.blit(font.render(message, True, (200, 0, 0)), (40, 535))
 
 
 
 def load_map(filename):
-    vehicles = set()
     with open(os.path.join("Map", filename)) as file:
-        for i, line in enumerate(file, 1):
-            line = line.strip()
-            if len(line) != 4:
-                continue
-            vid, y, x, o = line[0], int(line[1]), int(line[2]), line[3]
-            try:
-                vehicles.add(Vehicle(vid, y, x, o))
-            except ValueError as e:
-                print(f"Invalid vehicle at line {i} → {line}: {e}")
-                raise
-    return Problem(vehicles)
+        try:
+            return load_file(file)
+        except ValueError as e:
+            print(f"Invalid map {filename}: {e}")
+            raise
 
 def solve():
-    global solution, current_step, no_solution_found, playing
+    """Start the selected solver in the background."""
+    global solution, current_step, no_solution_found, solve_error, playing, worker
+    cancel_solve()
     playing = False # Prevent auto-play when solving a new map
+    solution = []
+    current_step = 0
+    no_solution_found = False
+    solve_error = None
     algo = solvers[solver_idx]
-    if algo == "A*":
-        result = a_star_solver(problem)
-    elif algo == "UCS":
-        result = ucs(problem)
-    elif algo == "BFS":
-        result = bfs(problem)
-    elif algo == "DFS":
-        result = dfs(problem)
+    new_worker = SolveWorker(algo, problem, move_models[model_idx].lower())
+    result = None
+    if new_worker.cacheable:
+        result = solution_cache.get(problem, algo.lower(),
+                                    model=new_worker.model)
+    if result is not None:
+        solution = result['solutions'][0] if result['solutions'] else []
+        no_solution_found = (len(solution) == 0)
+        return
+    if precheck(problem) is not None:
+        no_solution_found = True # Provably unsolvable, no need to search
+        return
+    worker = new_worker
+    worker.start()
+
+def cancel_solve():
+    """Stop the running search, if any, without waiting for it."""
+    global worker
+    if worker:
+        worker.cancel()
+        worker = None
+
+def collect_solution():
+    """Hand the result of a finished search over to the render loop."""
+    global solution, current_step, no_solution_found, solve_error, worker
+    if not worker or not worker.done.is_set():
+        return
+    result = worker.result
+    solve_error = result.get('error')
+    if solve_error:
+        print(f"{worker.algorithm} failed: {solve_error}")
+    elif worker.cacheable:
+        solution_cache.put(worker.problem, worker.algorithm.lower(), result,
+                           model=worker.model)
+    worker = None
     solution = result['solutions'][0] if result['solutions'] else []
     current_step = 0
     no_solution_found = (len(solution) == 0)
@@ -318,29 +442,44 @@ if __name__ == "__main__":
                     if 90 <= x <= 110:
                         if 70 <= y <= 95:  # Map <
                             click_sound.play()
+                            cancel_solve()
                             map_idx = (map_idx - 1) % len(maps)
                             problem = load_map(maps[map_idx])
                             solution = []
                             current_step = 0
                         elif 100 <= y <= 125:  # Solver <
                             click_sound.play()
+                            cancel_solve()
                             solver_idx = (solver_idx - 1) % len(solvers)
+                        elif 130 <= y <= 155:  # Moves <
+                            click_sound.play()
+                            cancel_solve()
+                            model_idx = (model_idx - 1) % len(move_models)
                     elif 193 <= x <= 213:
                         if 70 <= y <= 95:  # Map >
                             click_sound.play()
+                            cancel_solve()
                             map_idx = (map_idx + 1) % len(maps)
                             problem = load_map(maps[map_idx])
                             solution = []
                             current_step = 0
                         elif 100 <= y <= 125:  # Solver >
                             click_sound.play()
+                            cancel_solve()
                             solver_idx = (solver_idx + 1) % len(solvers)
+                        elif 130 <= y <= 155:  # Moves >
+                            click_sound.play()
+                            cancel_solve()
+                            model_idx = (model_idx + 1) % len(move_models)
 
                     # Buttons: Solve / Play / Reset / Return
                     if 50 <= x <= 170:
-                        if 170 <= y <= 210:  # Solve
+                        if 170 <= y <= 210:  # Solve / Cancel
                             click_sound.play()
-                            solve()
+                            if worker:
+                                cancel_solve()
+                            else:
+                                solve()
                         elif 230 <= y <= 270:  # Play
                             click_sound.play()
                             playing = not playing
@@ -350,18 +489,20 @@ if __name__ == "__main__":
                             playing = False
                         elif 350 <= y <= 390:  # Return to home
                             click_sound.play()
+                            cancel_solve()
                             screen_state = "home"
                             playing = False
                             current_step = 0
                             solution = []
 
 
+        collect_solution()
         if screen_state == "home":
             draw_home_screen()
         elif screen_state == "play":
             draw_game_ui()
             if solution:
-                draw_board(solution[current_step])
+                draw_board(solution[current_step].state)
             else:
                 draw_board(problem)
             if playing and solution and time.time() - last_play_time > 0.5:
@@ -372,4 +513,5 @@ if __name__ == "__main__":
         pygame.display.flip()
         pygame.time.Clock().tick(30)
 
+    cancel_solve()
     pygame.quit()
@@ -0,0 +1,336 @@
+"""
+Mine hard puzzles from whole components of the state space.
+
+A layout fixes the vehicles and the lanes they move in; its states are
+all the ways of placing them along their lanes. For each layout every
+goal state is made, and from each goal not seen yet the connected
+component around it is walked, one layer at a time, over packed state
+codes. A breadth first sweep from all goals of the component at once
+then gives the distance of each of its states to the nearest goal, and
+the last layer of the sweep holds the hardest starts of the component.
+Components without a goal are never walked. No Problem or Node objects
+are made inside the walk; moves are XORs with the precomputed slide
+masks of the layout.
+
+Layouts are drawn at random, task k from the seed and k alone, or taken
+from map files. Tasks run on a process pool and each finished one is
+appended to a checkpoint file, so an interrupted run picks up where it
+stopped. The hardest distinct puzzles found are written as map files.
+
+syntax: python miner.py [--layouts 100] [--seed 0] [--maps Map/]
+                        [--model step|slide] [--min-moves 20] [--top 20]
+                        [--workers 4] [--checkpoint mine.jsonl]
+                        [--output mined/]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cache import board_key
+from problem import Problem, load_file, map_lines
+from solver import MOVE_MODELS, _code_moves, _slide
+from symmetry import canonical
+from vehicle import CAR_IDS, TRUCK_IDS, Vehicle
+
+
+def random_layout(rng, vehicles=(9, 13), trucks=0.25, attempts=1000):
+    """
+    A classic board with X in the exit row and a random number, in the
+    range vehicles, of other cars and trucks; trucks is the chance of a
+    truck. Nothing but X lies along the exit row, since a vehicle there
+    would keep every state from the goal.
+
+    Exceptions:
+        ValueError: when no placement of the vehicles was found
+    """
+    count = rng.randint(*vehicles)
+    for _ in range(attempts):
+        cars = sorted(CAR_IDS - {'X'})
+        truck_ids = sorted(TRUCK_IDS)
+        placed = [Vehicle('X', rng.randrange(5), 2, 'H')]
+        taken = set(placed[0].cells())
+        misses = 0
+        while len(placed) <= count and misses < 100:
+            pool = truck_ids if truck_ids and rng.random() < trucks \
+                else cars
+            if not pool:
+                break
+            length = 3 if pool is truck_ids else 2
+            orientation = rng.choice('HV')
+            if orientation == 'H':
+                x, y = rng.randrange(7 - length), rng.choice((0, 1, 3, 4, 5))
+            else:
+                x, y = rng.randrange(6), rng.randrange(7 - length)
+            vehicle = Vehicle(pool[0], x, y, orientation)
+            cells = set(vehicle.cells())
+            if cells & taken:
+                misses += 1
+                continue
+            pool.pop(0)
+            placed.append(vehicle)
+            taken |= cells
+        if len(placed) > count:
+            return Problem(placed)
+    raise ValueError('No layout with {0} vehicles found'.format(count))
+
+
+def components(problem, model='step'):
+    """
+    Generate one dictionary for each component of the layout of problem
+    that holds a goal state, with:
+        'moves': moves from the hardest start to the nearest goal
+        'states': number of states in the component
+        'goals': number of goal states in it
+        'hardest': state code of the hardest start, the lowest one when
+            several are as far from the goals
+
+    Keyword Arguments:
+        model: one of solver.MOVE_MODELS (default='step')
+    """
+    layout = problem.layout
+    if layout.goal is None:
+        return
+    slide = _slide(model)
+    # The moves of each vehicle by position, without their names: for
+    # slides, runs of (cells that must be free, occupancy bits to flip,
+    # code bits to flip) to try in order until one is blocked, and for
+    # steps one flat tuple of them
+    moves = tuple(
+        tuple(tuple(tuple(move[1:] for move in run) for run in runs)
+              if slide else tuple(run[0][1:] for run in runs)
+              for runs in by_position)
+        for by_position in _code_moves(layout, slide))
+    shifts = tuple(zip(layout.shifts, moves))
+    position_mask = layout.position_mask
+
+    def expand(layer, seen):
+        """The states one move from layer that are not in seen, which
+        gets them added."""
+        next_layer = []
+        append = next_layer.append
+        add = seen.add
+        for code, occupied in layer:
+            for shift, table in shifts:
+                if slide:
+                    for run in table[(code >> shift) & position_mask]:
+                        for free, flip, code_flip in run:
+                            if occupied & free:
+                                break
+                            child = code ^ code_flip
+                            if child not in seen:
+                                add(child)
+                                append((child, occupied ^ flip))
+                    continue
+                for free, flip, code_flip in \
+                        table[(code >> shift) & position_mask]:
+                    if not occupied & free:
+                        child = code ^ code_flip
+                        if child not in seen:
+                            add(child)
+                            append((child, occupied ^ flip))
+        return next_layer
+
+    goals = {board.code: board.occupied for board in problem.goal_states()}
+    seen = set()
+    for start, occupied in goals.items():
+        if start in seen:
+            continue
+        # Walk the whole component, then sweep it from all of its goals
+        component = {start}
+        layer = [(start, occupied)]
+        while layer:
+            layer = expand(layer, component)
+        seen |= component
+        layer = [(code, goals[code]) for code in component if code in goals]
+        reached = {code for code, _ in layer}
+        sources = len(layer)
+        depth = -1
+        while layer:
+            last = layer
+            layer = expand(layer, reached)
+            depth += 1
+        yield {'moves': depth,
+               'states': len(component),
+               'goals': sources,
+               'hardest': min(code for code, _ in last)}
+
+
+def mine(problem, model='step', min_moves=0):
+    """
+    Hardest start of every solvable component of the layout of problem.
+    Returns (states, puzzles): the number of states walked and a list of
+    dictionaries with 'moves', 'states' and 'goals' as in components(),
+    and 'map', the lines of the map file of the start, for the
+    components at least min_moves from their goals.
+
+    Keyword Arguments:
+        model: one of solver.MOVE_MODELS (default='step')
+        min_moves: fewest moves of a puzzle to keep (default=0)
+    """
+    layout = problem.layout
+    states = 0
+    puzzles = []
+    for component in components(problem, model):
+        states += component['states']
+        if component['moves'] >= min_moves:
+            board = layout.state(layout.decode(component.pop('hardest')))
+            component['map'] = map_lines(board)
+            puzzles.append(component)
+    return states, puzzles
+
+
+def mine_task(task):
+    """Mine one (index, seed, lines, model, min_moves) task: the layout
+    of the map lines, or a random one from seed and index when lines is
+    None. Returns its checkpoint record."""
+    index, seed, lines, model, min_moves = task
+    start_time = time.time()
+    if lines is None:
+        problem = random_layout(random.Random('{0} {1}'.format(seed, index)))
+    else:
+        problem = load_file(lines)
+    states, puzzles = mine(problem, model, min_moves)
+    return {'task': index,
+            'states': states,
+            'time': round(time.time() - start_time, 6),
+            'puzzles': puzzles}
+
+
+def read_checkpoint(filename, settings):
+    """Records of the tasks finished in an earlier run with the same
+    settings, by task index.
+
+    Exceptions:
+        ValueError: when the checkpoint was written with other settings
+    """
+    records = dict()
+    if not filename or not os.path.exists(filename):
+        return records
+    with open(filename) as checkpoint_file:
+        for number, line in enumerate(checkpoint_file):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue   # Cut short by an interrupted run
+            if number == 0:
+                if record != settings:
+                    raise ValueError('Checkpoint {0} has other settings: '
+                                     '{1}'.format(filename, record))
+                continue
+            records[record['task']] = record
+    return records
+
+
+def run(tasks, settings, checkpoint=None, workers=None):
+    """
+    Mine every (index, seed, lines, model, min_moves) task on a process
+    pool, skipping the ones already in the checkpoint file and appending
+    the others to it as they finish. Yields every task record, the
+    checkpointed ones first.
+    """
+    records = read_checkpoint(checkpoint, settings)
+    yield from records.values()
+    todo = [task for task in tasks if task[0] not in records]
+    if not todo:
+        return
+    checkpoint_file = None
+    if checkpoint:
+        new = not os.path.exists(checkpoint) or not records
+        os.makedirs(os.path.dirname(checkpoint) or '.', exist_ok=True)
+        checkpoint_file = open(checkpoint, 'w' if new else 'a')
+        if new:
+            checkpoint_file.write(json.dumps(settings) + '\n')
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(mine_task, task) for task in todo]
+            for future in as_completed(futures):
+                record = future.result()
+                if checkpoint_file is not None:
+                    checkpoint_file.write(json.dumps(record) + '\n')
+                    checkpoint_file.flush()
+                yield record
+    finally:
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+
+
+def hardest(records, top=20):
+    """The top hardest distinct puzzles of the records, hardest first,
+    relabellings of one board counted once."""
+    found = dict()
+    for record in sorted(records, key=lambda record: record['task']):
+        for puzzle in record['puzzles']:
+            board, _ = canonical(load_file(puzzle['map']))
+            found.setdefault(board_key(board), dict(puzzle,
+                                                    task=record['task']))
+    return sorted(found.values(),
+                  key=lambda puzzle: (-puzzle['moves'], -puzzle['states'],
+                                      puzzle['task']))[:top]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mine hard puzzles.')
+    parser.add_argument('--layouts', type=int, default=100,
+                        help='random layouts to mine (default 100)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--maps', default=None,
+                        help='mine the layouts of these map files instead, '
+                             'a directory or a glob pattern')
+    parser.add_argument('--model', default='step', choices=MOVE_MODELS)
+    parser.add_argument('--min-moves', type=int, default=20)
+    parser.add_argument('--top', type=int, default=20,
+                        help='hardest puzzles to write (default 20)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None,
+                        help='JSON lines file to resume from and append to')
+    parser.add_argument('--output', default=None,
+                        help='directory to write the puzzles to')
+    args = parser.parse_args()
+
+    if args.maps is None:
+        tasks = [(index, args.seed, None, args.model, args.min_moves)
+                 for index in range(args.layouts)]
+    else:
+        if os.path.isdir(args.maps):
+            filenames = sorted(glob.glob(os.path.join(args.maps, '*.txt')))
+        else:
+            filenames = sorted(glob.glob(args.maps))
+        tasks = []
+        for index, filename in enumerate(filenames):
+            with open(filename) as rushhour_file:
+                tasks.append((index, None, rushhour_file.read().splitlines(),
+                              args.model, args.min_moves))
+    settings = {'seed': args.seed, 'maps': args.maps, 'model': args.model,
+                'min_moves': args.min_moves}
+
+    start_time = time.time()
+    records = []
+    try:
+        for record in run(tasks, settings, args.checkpoint, args.workers):
+            records.append(record)
+    except ValueError as e:
+        sys.exit(str(e))
+    end_time = time.time()
+
+    states = sum(record['states'] for record in records)
+    mined = sum(record['time'] for record in records)
+    print(f"{len(records)} layouts, {states} states "
+          f"({states / mined if mined else 0:.0f} states/s per process)")
+    puzzles = hardest(records, args.top)
+    for rank, puzzle in enumerate(puzzles, 1):
+        print(f"{rank}: {puzzle['moves']} moves, {puzzle['states']} states "
+              f"in component, {puzzle['goals']} goals (task {puzzle['task']})")
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            filename = os.path.join(args.output,
+                                    'mined_{0:02d}.txt'.format(rank))
+            with open(filename, 'w') as map_file:
+                map_file.write('\n'.join(puzzle['map']) + '\n')
+    print(f"Time taken: {end_time - start_time:.4f} seconds")
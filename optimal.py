@@ -0,0 +1,205 @@
+"""
+Every optimal solution of a board, kept as a shortest-path DAG.
+
+A uniform cost search records, for each state, all of the states it is
+reached from at its optimal cost instead of only the first one. The DAG
+is then cut down to the states that lie on an optimal solution. The
+number of optimal solutions is counted on the DAG by dynamic programming
+in order of cost, without building any of them, and solutions() walks
+the DAG backward from the goals to produce them lazily, one at a time.
+
+syntax: python optimal.py Map/map_01.txt [--cost length|unit|cells]
+                          [--model step|slide] [--top 5]
+"""
+import argparse
+import itertools
+import sys
+import time
+
+from problem import load_file, solution_steps
+from solver import COSTS, MOVE_MODELS, BucketQueue, Node, _slide, _successors
+
+
+class SolutionDag(object):
+    """
+    Optimal solutions of a board: the states on them, each with the
+    (predecessor code, move) pairs it is optimally reached from.
+    """
+
+    def __init__(self, problem, goals, predecessors, costs, visited=0):
+        """Create a DAG from the result of a search; see build().
+
+        Arguments:
+            problem: the board the solutions start from.
+            goals: state codes of the goal states reached at optimal cost.
+            predecessors: dict of state code -> tuple of (predecessor code,
+                move) pairs, for every state on an optimal solution.
+            costs: dict of state code -> optimal cost from problem.
+
+        Keyword Arguments:
+            visited: number of states the search expanded (default=0)
+        """
+        self.problem = problem
+        self.goals = tuple(goals)
+        self.predecessors = predecessors
+        self.costs = costs
+        self.visited = visited
+        self.cost = costs[goals[0]] if goals else None
+        self.paths = self._count()
+
+    @classmethod
+    def build(cls, problem, model='step', cost='length', stats=None):
+        """
+        Search problem for all of its optimal solutions.
+
+        Keyword Arguments:
+            model: one of solver.MOVE_MODELS (default='step')
+            cost: name of the cost model in solver.COSTS (default='length')
+            stats: a stats.SearchStats to fill in (default=None)
+        """
+        slide = _slide(model)
+        move_cost = COSTS[cost]
+        layout = problem.layout
+        costs = {problem.code: 0}
+        predecessors = {problem.code: []}
+        goals = []
+        best = None
+        visited = 0
+        queue = BucketQueue()
+        queue.push(0, 0, problem)
+        while queue:
+            g, _, board = queue.pop()
+            code = board.code
+            if g > costs[code]:
+                continue   # Reached more cheaply since it was pushed
+            if best is not None and g > best:
+                break      # Every optimal solution is known
+            visited += 1
+            if stats is not None:
+                stats.expand(len(queue), board)
+            if board.solved():
+                best = g
+                goals.append(code)
+                continue
+            for step, child in _successors(board, stats, slide):
+                new_g = g + move_cost(layout, step)
+                old = costs.get(child.code)
+                if old is None or new_g < old:
+                    costs[child.code] = new_g
+                    predecessors[child.code] = [(code, step)]
+                    queue.push(new_g, new_g, child)
+                elif new_g == old:
+                    predecessors[child.code].append((code, step))
+
+        # Keep only the states some optimal solution goes through
+        kept = dict()
+        stack = list(goals)
+        while stack:
+            code = stack.pop()
+            if code in kept:
+                continue
+            kept[code] = tuple(predecessors[code])
+            stack.extend(parent for parent, _ in kept[code])
+        return cls(problem, goals, kept,
+                   {code: costs[code] for code in kept}, visited)
+
+    def _count(self):
+        """Number of optimal paths from the start to each state."""
+        paths = dict()
+        for code in sorted(self.predecessors, key=self.costs.__getitem__):
+            if code == self.problem.code:
+                paths[code] = 1
+            else:
+                paths[code] = sum(paths[parent]
+                                  for parent, _ in self.predecessors[code])
+        return paths
+
+    def __len__(self):
+        """Number of states on optimal solutions."""
+        return len(self.predecessors)
+
+    def count(self):
+        """Number of optimal solutions, 0 when there is none."""
+        return sum(self.paths[goal] for goal in self.goals)
+
+    def solutions(self, limit=None):
+        """
+        Generate the optimal solutions one at a time, as tuples of Nodes
+        like the solvers return.
+
+        Keyword Arguments:
+            limit: most solutions to generate (default=None, all of them)
+        """
+        generated = self._solutions()
+        if limit is not None:
+            generated = itertools.islice(generated, limit)
+        return generated
+
+    def _solutions(self):
+        layout = self.problem.layout
+        start = self.problem.code
+        # Walk backward; a partial solution is a linked list of
+        # (code, move, rest) from a state to the goal
+        for goal in self.goals:
+            stack = [(goal, None)]
+            while stack:
+                code, rest = stack.pop()
+                if code == start:
+                    node = Node(self.problem)
+                    while rest is not None:
+                        child, move, rest = rest
+                        node = Node(layout.state(layout.decode(child)), node,
+                                    move)
+                    yield node.path()
+                    continue
+                for parent, move in reversed(self.predecessors[code]):
+                    stack.append((parent, (code, move, rest)))
+
+
+def all_optimal(initial_state, limit=None, stats=None, model='step',
+                cost='length'):
+    """
+    Optimal solutions of the given Problem board.
+    Returns a dictionary with:
+        'visited': number of states expanded
+        'solutions': up to limit optimal solutions, as tuples of Nodes
+        'count': number of optimal solutions, including those not listed
+        'cost': their cost, or None without a solution
+
+    Keyword Arguments:
+        limit: most solutions to list (default=None, all of them)
+        stats: a stats.SearchStats to fill in (default=None)
+        model: one of solver.MOVE_MODELS (default='step')
+        cost: name of the cost model in solver.COSTS (default='length')
+    """
+    dag = SolutionDag.build(initial_state, model, cost, stats)
+    return {'visited': dag.visited,
+            'solutions': list(dag.solutions(limit)),
+            'count': dag.count(),
+            'cost': dag.cost}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Count the optimal '
+                                                 'solutions of a map.')
+    parser.add_argument('map')
+    parser.add_argument('--cost', default='length', choices=list(COSTS))
+    parser.add_argument('--model', default='step', choices=MOVE_MODELS)
+    parser.add_argument('--top', type=int, default=5,
+                        help='optimal solutions to print (default 5)')
+    args = parser.parse_args()
+
+    with open(args.map) as rushhour_file:
+        problem = load_file(rushhour_file)
+    start_time = time.time()
+    dag = SolutionDag.build(problem, args.model, args.cost)
+    end_time = time.time()
+
+    if dag.cost is None:
+        print('No solution')
+        sys.exit(1)
+    print(f"{dag.count()} optimal solutions of cost {dag.cost}")
+    print(f"{len(dag)} states on them, {dag.visited} states expanded")
+    for solution in dag.solutions(args.top):
+        print('Solution:', ', '.join(solution_steps(solution)))
+    print(f"Time taken: {end_time - start_time:.4f} seconds")
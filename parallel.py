@@ -0,0 +1,264 @@
+"""
+Hash-distributed A* (and BFS) over several worker processes.
+
+Every state is owned by one worker, chosen by its Zobrist key. A worker
+keeps the open and closed lists of the states it owns; children owned by
+another worker are sent to it in batches through its inbox queue. The
+best solution cost found so far is shared, and states that cannot beat
+it are dropped, so the first solution is not taken blindly: the search
+only ends when no worker has anything left below the incumbent and no
+batch is in flight, which keeps A* optimal.
+
+Termination is detected by the parent process: each worker counts the
+batches it sends and receives in shared counters, marks itself busy
+before counting a receipt and idle only after flushing its sends. When
+two scans in a row see every worker idle and the same equal sent and
+received totals, no work is left anywhere.
+
+syntax: python parallel.py Map/map_14.txt [--algorithm a*|bfs]
+                           [--workers 4] [--model step|slide]
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from problem import load_file, solution_steps
+from solver import COSTS, BucketQueue, Node, _slide, heuristic
+
+INF = float('inf')
+
+EXPAND_BATCH = 64
+"""Expansions a worker makes between two exchanges of batches."""
+
+
+def zero(state):
+    """Heuristic of parallel_bfs: no estimate at all."""
+    return 0
+
+
+def _owner(key, workers):
+    return key % workers
+
+
+class _Shared(object):
+    """Values shared by the workers and the parent process."""
+
+    def __init__(self, context, workers):
+        self.sent = context.Value('q', 0)
+        self.received = context.Value('q', 0)
+        self.idle = context.Array('b', [1] * workers)
+        self.incumbent = context.Value('d', INF)  # best solution cost
+        self.goal = context.Value('Q', 0)         # its goal state code
+
+
+def _worker(me, initial_state, heuristic, slide, cost, inboxes, results,
+            shared):
+    """Worker process body: expand the states owned by worker me."""
+    layout = initial_state.layout
+    workers = len(inboxes)
+    inbox = inboxes[me]
+    move_cost = COSTS[cost]
+    open_list = BucketQueue()
+    table = dict()   # code -> (g, parent code, move) of every state reached
+    outgoing = [[] for _ in range(workers)]
+    expanded = 0
+
+    def reach(g, code, parent, move, state=None):
+        old = table.get(code)
+        if old is not None and old[0] <= g:
+            return
+        if state is None:
+            state = layout.state(layout.decode(code))
+        h = heuristic(state)
+        if g + h >= shared.incumbent.value:
+            return   # Cannot lead to a cheaper solution
+        table[code] = (g, parent, move)
+        open_list.push(g + h, g, state)
+
+    idle = True
+    while True:
+        # Take in every batch that is waiting; wait for one when idle
+        while True:
+            try:
+                message = inbox.get(timeout=0.05) if idle else \
+                    inbox.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(message, tuple):
+                command, code = message
+                if command == 'stop':
+                    results.put(('expanded', expanded))
+                    return
+                # 'parent': where the state with this code was reached from
+                results.put(('parent', code) + table[code][1:])
+                continue
+            if idle:
+                idle = False
+                shared.idle[me] = 0
+            with shared.received.get_lock():
+                shared.received.value += 1
+            for g, code, parent, move in message:
+                reach(g, code, parent, move)
+
+        for _ in range(EXPAND_BATCH):
+            if not open_list:
+                break
+            f, g, state = open_list.pop()
+            if f >= shared.incumbent.value:
+                open_list = BucketQueue()   # Nothing left can do better
+                break
+            code = state.code
+            if table[code][0] < g:
+                continue   # Reached more cheaply since it was pushed
+            expanded += 1
+            if state.solved():
+                with shared.incumbent.get_lock():
+                    if g < shared.incumbent.value:
+                        shared.incumbent.value = g
+                        shared.goal.value = code
+                continue
+            children = state.slide_successors() if slide else \
+                state.successors()
+            for step, child in children:
+                new_g = g + move_cost(layout, step)
+                owner = _owner(child.key, workers)
+                if owner == me:
+                    reach(new_g, child.code, code, step, child)
+                else:
+                    outgoing[owner].append((new_g, child.code, code, step))
+
+        for owner, batch in enumerate(outgoing):
+            if batch:
+                with shared.sent.get_lock():
+                    shared.sent.value += 1
+                inboxes[owner].put(batch)
+                outgoing[owner] = []
+        if not open_list and not idle:
+            idle = True
+            shared.idle[me] = 1
+
+
+def _finished(shared):
+    """One termination scan: (all idle, sent total, received total)."""
+    idle = all(shared.idle[:])
+    return idle, shared.sent.value, shared.received.value
+
+
+def parallel_a_star(initial_state, workers=None, heuristic=heuristic,
+                    model='step', cost='length'):
+    """
+    Hash-distributed A*: an optimal solution found by several processes.
+    Returns a dictionary with:
+        'visited': number of states expanded by all workers
+        'solutions': list with an optimal solution path, as a tuple of Nodes
+        'depth_states': empty, kept for the shape of the other solvers
+
+    Keyword Arguments:
+        workers: number of worker processes (default=os.cpu_count())
+        heuristic: admissible estimate of the remaining cost, a module
+            level function or a picklable object (default=heuristic)
+        model: one of solver.MOVE_MODELS (default='step')
+        cost: name of the cost model in solver.COSTS (default='length')
+
+    Exceptions:
+        ValueError: when the state codes of the board do not fit in the
+            64 bits the workers share them in
+    """
+    slide = _slide(model)
+    if initial_state.layout.code_bits > 64:
+        raise ValueError('State codes of {0} bits are too long to share'
+                         .format(initial_state.layout.code_bits))
+    workers = workers or os.cpu_count()
+    if initial_state.solved():
+        return {'visited': 0,
+                'solutions': [(Node(initial_state),)],
+                'depth_states': {}}
+    if heuristic(initial_state) == INF:
+        return {'visited': 0, 'solutions': [], 'depth_states': {}}
+
+    context = multiprocessing.get_context('spawn')
+    shared = _Shared(context, workers)
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    processes = [context.Process(target=_worker,
+                                 args=(me, initial_state, heuristic, slide,
+                                       cost, inboxes, results, shared))
+                 for me in range(workers)]
+    for process in processes:
+        process.start()
+
+    start = initial_state.code
+    with shared.sent.get_lock():
+        shared.sent.value += 1
+    inboxes[_owner(initial_state.key, workers)].put([(0, start, None, None)])
+
+    previous = None
+    while True:
+        time.sleep(0.01)
+        scan = _finished(shared)
+        if scan[0] and scan[1] == scan[2] and scan == previous:
+            break
+        previous = scan
+
+    solutions = []
+    if shared.incumbent.value != INF:
+        # Follow the parent links from the goal, asking each state's owner
+        layout = initial_state.layout
+        steps = []
+        code = shared.goal.value
+        while code != start:
+            state = layout.state(layout.decode(code))
+            inboxes[_owner(state.key, workers)].put(('parent', code))
+            _, _, parent, move = results.get()
+            steps.append((state, move))
+            code = parent
+        node = Node(initial_state)
+        for state, move in reversed(steps):
+            node = Node(state, node, move)
+        solutions.append(node.path())
+
+    for inbox in inboxes:
+        inbox.put(('stop', None))
+    expanded = sum(results.get()[1] for _ in processes)
+    for process in processes:
+        process.join()
+    return {'visited': expanded, 'solutions': solutions, 'depth_states': {}}
+
+
+def parallel_bfs(initial_state, workers=None, model='step'):
+    """
+    A solution with the fewest moves, found by hash-distributed search
+    with unit move costs and no heuristic. Returns the same dictionary as
+    parallel_a_star.
+    """
+    return parallel_a_star(initial_state, workers, heuristic=zero,
+                           model=model, cost='unit')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve a map on several '
+                                                 'processes.')
+    parser.add_argument('map')
+    parser.add_argument('--algorithm', default='a*', choices=['a*', 'bfs'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--model', default='step', choices=['step', 'slide'])
+    args = parser.parse_args()
+
+    with open(args.map) as rushhour_file:
+        problem = load_file(rushhour_file)
+    start_time = time.time()
+    if args.algorithm == 'a*':
+        results = parallel_a_star(problem, args.workers, model=args.model)
+    else:
+        results = parallel_bfs(problem, args.workers, model=args.model)
+    end_time = time.time()
+
+    print(f"{len(results['solutions'])} Solutions found")
+    for solution in results['solutions']:
+        print('Solution:', ', '.join(solution_steps(solution)))
+    print(f"{results['visited']} Nodes expanded")
+    print(f"Time taken: {end_time - start_time:.4f} seconds")
+    sys.exit(0 if results['solutions'] else 1)
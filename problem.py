@@ -1,160 +1,740 @@
+import argparse
+import inspect
 import sys
-from vehicle import Vehicle
-from solver import ucs, bfs, dfs, dls, a_star_solver
-import time
-import tracemalloc
+import random
+from vehicle import BOARD_SIZE, Vehicle, default_length
+from solver import COSTS, MOVE_MODELS, SOLVERS
+from stats import Budget, BudgetExhausted
+
+
+SIZE = BOARD_SIZE
+"""Width and height of the classic board, in cells."""
+
+POSITION_BITS = 3
+"""Bits per vehicle position in a packed state code of the classic board;
+see Geometry.position_bits for other boards."""
+
+EXITS = {'R': 'H', 'L': 'H', 'D': 'V', 'U': 'V'}
+"""Sides of the board an exit can be on, with the orientation the goal
+vehicle needs to leave through it."""
+
+
+def cell(x, y):
+    """Bit of the occupancy mask of the classic board for cell (x, y)."""
+    return 1 << (y * SIZE + x)
+
+
+def zobrist(id, orientation, lane, position):
+    """Random 64 bit Zobrist code of a vehicle placement.
+
+    Seeded by the placement itself, so a board gets the same key in every
+    process and every Layout it appears in.
+    """
+    seed = '{0} {1} {2} {3}'.format(id, orientation, lane, position)
+    return random.Random(seed).getrandbits(64)
+
+
+class Geometry(object):
+    """The shape of a board: its size, its wall cells and its exit.
+
+    Cell (x, y) is bit y * width + x of an occupancy mask. The exit is a
+    side of the board and the lane it opens: ('R', 2) is the right end of
+    row 2. L and R exits let out a horizontal goal vehicle, U and D a
+    vertical one. Without an exit the goal vehicle leaves by the right end
+    of whichever row it is in, as on the classic board.
+    """
+
+    def __init__(self, width=SIZE, height=SIZE, walls=(), exit=None):
+        """Create the geometry of a board.
+
+        Keyword Arguments:
+            width: number of columns (default=SIZE)
+            height: number of rows (default=SIZE)
+            walls: iterable of (x, y) cells no vehicle can enter
+                (default=no walls)
+            exit: (side, lane) pair, side one of EXITS (default=None)
+
+        Exceptions:
+            ValueError: on a size below 1, a wall off the board or an exit
+                that is not on a side of the board
+        """
+        if width < 1 or height < 1:
+            raise ValueError('Invalid board size {0}x{1}'.format(width,
+                                                                 height))
+        self.width = width
+        self.height = height
+        self.walls = tuple(sorted(set((x, y) for x, y in walls)))
+        for x, y in self.walls:
+            if not (0 <= x < width and 0 <= y < height):
+                raise ValueError('Wall {0},{1} is off the board'.format(x, y))
+        if exit is not None:
+            side, lane = exit
+            if side not in EXITS or not 0 <= lane < (
+                    height if EXITS[side] == 'H' else width):
+                raise ValueError('Invalid exit {0}{1}'.format(side, lane))
+            exit = (side, lane)
+        self.exit = exit
+        self.wall_mask = sum(self.cell(x, y) for x, y in self.walls)
+        # Bits per position in state codes: enough for the longest lane
+        self.position_bits = max(max(width, height) - 1, 1).bit_length()
+
+    @property
+    def signature(self):
+        """Tuple that identifies the geometry; Geometry(*signature) makes
+        an equal one."""
+        return (self.width, self.height, self.walls, self.exit)
+
+    def __eq__(self, other):
+        return self.signature == other.signature
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.signature)
+
+    def __repr__(self):
+        return 'Geometry({0}, {1}, walls={2}, exit={3})'.format(
+            *self.signature)
+
+    def cell(self, x, y):
+        """Bit of the occupancy mask that stands for cell (x, y)."""
+        return 1 << (y * self.width + x)
+
+    def lane_length(self, orientation):
+        """Cells along a lane of vehicles of the given orientation."""
+        return self.width if orientation == 'H' else self.height
+
+    def fits(self, vehicle):
+        """True if vehicle lies inside the board."""
+        if vehicle.orientation == 'H':
+            return (vehicle.y < self.height and
+                    vehicle.x + vehicle.length <= self.width)
+        return (vehicle.x < self.width and
+                vehicle.y + vehicle.length <= self.height)
+
+    def mask(self, vehicle):
+        """Cells covered by vehicle, as an occupancy mask."""
+        return sum(self.cell(x, y) for x, y in vehicle.cells())
+
+
+CLASSIC = Geometry()
+"""The 6x6 board without walls of the original puzzle."""
+
+
+class Layout(object):
+    """The fixed part of a Rush Hour board, shared by all of its states.
+
+    Vehicles are kept in a fixed order (sorted by id). A state only needs
+    the position of each vehicle along its lane: x for horizontal vehicles,
+    y for vertical ones. Every slide a vehicle can make is precomputed as a
+    mask of cells that must be free, a mask of cells that change owner and
+    the XOR that updates the Zobrist key of the board.
+    """
+
+    def __init__(self, vehicles, geometry=None):
+        """Create the layout of a board.
+
+        Arguments:
+            vehicles: an iterable of Vehicle objects.
+
+        Keyword Arguments:
+            geometry: the Geometry of the board (default=CLASSIC)
+
+        Exceptions:
+            ValueError: on duplicate vehicle ids or vehicles off the board
+        """
+        self.geometry = geometry = CLASSIC if geometry is None else geometry
+        self.walls = geometry.wall_mask
+        vehicles = sorted(vehicles)
+        self.ids = tuple(v.id for v in vehicles)
+        if len(set(self.ids)) != len(self.ids):
+            raise ValueError('Duplicate vehicle id')
+        for v in vehicles:
+            if not geometry.fits(v):
+                raise ValueError('Vehicle {0} is off the board'.format(v.id))
+        self.lengths = tuple(v.length for v in vehicles)
+        self.orientations = tuple(v.orientation for v in vehicles)
+        self.lanes = tuple(v.y if v.orientation == 'H' else v.x
+                           for v in vehicles)
+        self.index = {vid: i for i, vid in enumerate(self.ids)}
+        self.length_of = dict(zip(self.ids, self.lengths))
+        # Where each position sits in a state code: (code >> shifts[i]) &
+        # position_mask is the position of vehicle i
+        self.position_bits = geometry.position_bits
+        self.shifts = tuple(i * self.position_bits
+                            for i in range(len(self.ids)))
+        self.position_mask = (1 << self.position_bits) - 1
+        self.code_bits = self.position_bits * len(self.ids)
+
+        # placements[i][p]: the shared Vehicle of vehicle i at position p
+        self.placements = tuple(
+            tuple(self._placement(i, p)
+                  for p in range(geometry.lane_length(self.orientations[i]) -
+                                 self.lengths[i] + 1))
+            for i in range(len(self.ids)))
+
+        # masks[i][p]: cells covered by vehicle i at position p; placements
+        # of the classic table carry theirs for the classic board, the
+        # others (any other id or length) are masked by the geometry
+        classic = geometry == CLASSIC
+        self.masks = tuple(
+            tuple(v.mask if classic and v.mask is not None
+                  else geometry.mask(v) for v in placements)
+            for placements in self.placements)
+
+        # keys[i][p]: Zobrist code of vehicle i at position p
+        self.keys = tuple(
+            tuple(zobrist(self.ids[i], self.orientations[i], self.lanes[i], p)
+                  for p in range(len(self.masks[i])))
+            for i in range(len(self.ids)))
+
+        # slides[i][p]: (direction, new position, cells that must be free,
+        # cells to flip in the occupancy mask, bits to flip in the key, bits
+        # to flip in the state code) for vehicle i at position p
+        self.slides = tuple(
+            tuple(self._slides(i, p) for p in range(len(self.masks[i])))
+            for i in range(len(self.ids)))
+
+        # runs[i][p]: for each direction vehicle i can go from position p,
+        # its slides by 1, 2, ... cells, as (direction, new position, cell
+        # that must be free beyond the previous slide, cells to flip, key
+        # bits to flip, code bits to flip, distance)
+        self.runs = tuple(
+            tuple(self._runs(i, p) for p in range(len(self.masks[i])))
+            for i in range(len(self.ids)))
+
+        # The goal vehicle must lie along the lane of the exit to ever
+        # reach it.
+        side, lane = geometry.exit or ('R', None)
+        self.goal = self.index.get('X')
+        if self.goal is not None and (
+                self.orientations[self.goal] != EXITS[side] or
+                lane not in (None, self.lanes[self.goal])):
+            self.goal = None
+        self.goal_position = None
+        self.exit_masks = ()
+        if self.goal is not None:
+            goal = self.goal
+            last = len(self.masks[goal]) - 1
+            self.goal_position = last if side in 'RD' else 0
+            # exit_masks[p]: cells between the goal vehicle and the exit
+            masks = self.masks[goal]
+            exit_masks = []
+            for p in range(last + 1):
+                cells = 0
+                for q in (range(p, last + 1) if side in 'RD'
+                          else range(p + 1)):
+                    cells |= masks[q]
+                exit_masks.append(cells & ~masks[p])
+            self.exit_masks = tuple(exit_masks)
+
+    @property
+    def signature(self):
+        """Tuple that identifies the layout independently of any state."""
+        return (self.ids, self.orientations, self.lanes, self.lengths,
+                self.geometry.signature)
+
+    def __eq__(self, other):
+        return self.signature == other.signature
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.signature)
+
+    def _placement(self, i, p):
+        if self.orientations[i] == 'H':
+            return Vehicle(self.ids[i], p, self.lanes[i], 'H', self.lengths[i])
+        return Vehicle(self.ids[i], self.lanes[i], p, 'V', self.lengths[i])
+
+    def _slides(self, i, p):
+        masks = self.masks[i]
+        keys = self.keys[i]
+        back, forward = ('L', 'R') if self.orientations[i] == 'H' else ('U', 'D')
+        shift = self.shifts[i]
+        slides = []
+        if p > 0:
+            slides.append((back, p - 1, masks[p - 1] & ~masks[p],
+                           masks[p] ^ masks[p - 1], keys[p] ^ keys[p - 1],
+                           (p ^ (p - 1)) << shift))
+        if p + 1 < len(masks):
+            slides.append((forward, p + 1, masks[p + 1] & ~masks[p],
+                           masks[p] ^ masks[p + 1], keys[p] ^ keys[p + 1],
+                           (p ^ (p + 1)) << shift))
+        return tuple(slides)
+
+    def _runs(self, i, p):
+        masks = self.masks[i]
+        keys = self.keys[i]
+        back, forward = ('L', 'R') if self.orientations[i] == 'H' else ('U', 'D')
+        shift = self.shifts[i]
+        runs = []
+        for direction, step, end in ((back, -1, -1),
+                                     (forward, 1, len(masks))):
+            run = tuple((direction, q, masks[q] & ~masks[q - step],
+                         masks[p] ^ masks[q], keys[p] ^ keys[q],
+                         (p ^ q) << shift, abs(q - p))
+                        for q in range(p + step, end, step))
+            if run:
+                runs.append(run)
+        return tuple(runs)
+
+    def encode(self, positions):
+        """Pack a tuple of positions into a single int state code."""
+        code = 0
+        bits = self.position_bits
+        for i, p in enumerate(positions):
+            code |= p << (i * bits)
+        return code
+
+    def decode(self, code):
+        """Unpack a state code made by encode() into a tuple of positions."""
+        mask = self.position_mask
+        return tuple((code >> shift) & mask for shift in self.shifts)
+
+    def state(self, positions):
+        """The Problem with the vehicles of this layout at positions."""
+        occupied = self.walls
+        key = 0
+        for i, p in enumerate(positions):
+            occupied |= self.masks[i][p]
+            key ^= self.keys[i][p]
+        return Problem.from_state(self, tuple(positions), occupied, key,
+                                  self.encode(positions))
+
+    def vehicle(self, i, p):
+        """The Vehicle object for vehicle i at position p."""
+        return self.placements[i][p]
 
 
 class Problem(object):
-    """A configuration of a single Rush Hour board."""
+    """A configuration of a single Rush Hour board.
+
+    A state is the shared Layout, a tuple with the position of every
+    vehicle in layout order and an occupancy mask of the board, walls
+    included, with one bit per cell (36 on the classic board). Its
+    64 bit Zobrist key and its packed state code are computed once and
+    updated incrementally by successors(); the key is the hash used by
+    every visited set, the code is what closed lists store.
+    """
 
-    def __init__(self, vehicles):
+    __slots__ = ('layout', 'positions', 'occupied', 'key', 'code')
+
+    def __init__(self, vehicles, geometry=None):
         """Create a new Rush Hour board.
 
         Arguments:
             vehicles: a set of Vehicle objects.
         Goal vehicle ID: X
+
+        Keyword Arguments:
+            geometry: the Geometry of the board (default=CLASSIC)
+
+        Exceptions:
+            ValueError: on duplicate ids, vehicles off the board or
+                overlapping vehicles or walls
         """
-        self.vehicles = vehicles
-        self.goal_vehicle = None
-        for v in self.vehicles:
-            if v.id == 'X':
-                self.goal_vehicle = v
-                break
+        layout = Layout(vehicles, geometry)
+        by_id = {v.id: v for v in vehicles}
+        positions = []
+        occupied = layout.walls
+        key = 0
+        for i, vid in enumerate(layout.ids):
+            v = by_id[vid]
+            p = v.x if v.orientation == 'H' else v.y
+            mask = layout.masks[i][p]
+            if occupied & mask:
+                raise ValueError('Overlapping vehicle {0}'.format(vid))
+            occupied |= mask
+            key ^= layout.keys[i][p]
+            positions.append(p)
+        self.layout = layout
+        self.positions = tuple(positions)
+        self.occupied = occupied
+        self.key = key
+        self.code = layout.encode(self.positions)
+
+    @classmethod
+    def from_state(cls, layout, positions, occupied, key, code):
+        """Create a board directly from its compact state."""
+        problem = object.__new__(cls)
+        problem.layout = layout
+        problem.positions = positions
+        problem.occupied = occupied
+        problem.key = key
+        problem.code = code
+        return problem
+
+    @property
+    def vehicles(self):
+        """The set of Vehicle objects on the board."""
+        placements = self.layout.placements
+        return {placements[i][p] for i, p in enumerate(self.positions)}
+
+    @property
+    def goal_vehicle(self):
+        i = self.layout.index.get('X')
+        return None if i is None else self.layout.vehicle(i, self.positions[i])
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return self.key
 
     def __eq__(self, other):
-        return self.vehicles == other.vehicles
+        return (self.key == other.key and
+                self.positions == other.positions and
+                (self.layout is other.layout or self.layout == other.layout))
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __lt__(self, other):
-        return hash(self) < hash(other)
+        return self.positions < other.positions
 
     def __repr__(self):
-        s = '-' * 8 + '\n'
+        s = '-' * (self.layout.geometry.width + 2) + '\n'
         for line in self.get_board():
-            s += '|{0}|\n'.format(''.join(line))
-        s += '-' * 8 + '\n'
+            s += '|{0}|\n'.format(''.join(cell[0] for cell in line))
+        s += '-' * (self.layout.geometry.width + 2) + '\n'
         return s
 
     def get_board(self):
-        """Representation of the Rush Hour board as a 2D list of strings"""
-        board = [[' ', ' ', ' ', ' ', ' ', ' '],
-                 [' ', ' ', ' ', ' ', ' ', ' '],
-                 [' ', ' ', ' ', ' ', ' ', ' '],
-                 [' ', ' ', ' ', ' ', ' ', ' '],
-                 [' ', ' ', ' ', ' ', ' ', ' '],
-                 [' ', ' ', ' ', ' ', ' ', ' ']]
-        for vehicle in self.vehicles:
-            x, y = vehicle.x, vehicle.y
-            if vehicle.orientation == 'H':
-                for i in range(vehicle.length):
-                    board[y][x + i] = vehicle.id
+        """Representation of the Rush Hour board as a 2D list of strings,
+        with '#' for walls"""
+        geometry = self.layout.geometry
+        board = [[' '] * geometry.width for _ in range(geometry.height)]
+        for x, y in geometry.walls:
+            board[y][x] = '#'
+        for v in self.vehicles:
+            x, y = v.x, v.y
+            if v.orientation == 'H':
+                for i in range(v.length):
+                    board[y][x + i] = v.id
             else:
-                for i in range(vehicle.length):
-                    board[y + i][x] = vehicle.id
+                for i in range(v.length):
+                    board[y + i][x] = v.id
         return board
 
     def solved(self):
-        for v in self.vehicles:
-            if v.id == 'X' and v.orientation == 'H':
-                if v.x + v.length - 1 == 5:
-                    return True
-        return False
+        goal = self.layout.goal
+        return (goal is not None and
+                self.positions[goal] == self.layout.goal_position)
+
+    def goal_states(self):
+        """Return iterator of every solved board with the same vehicles.
+
+        Vehicles that share a lane can never pass each other, so only
+        boards that keep their order are generated. The goal vehicle is
+        placed first, then the vehicles across its lane and then those
+        with the fewest positions, so that dead ends are found early.
+        """
+        layout = self.layout
+        goal = layout.goal
+        if goal is None:
+            return
+        start = self.positions
+        count = len(layout.ids)
+        lane_cells = 0
+        for mask in layout.masks[goal]:
+            lane_cells |= mask
+        order = [goal] + sorted(
+            (i for i in range(count) if i != goal),
+            key=lambda i: (not any(mask & lane_cells
+                                   for mask in layout.masks[i]),
+                           len(layout.masks[i]), i))
+        lanes = [(layout.orientations[i], layout.lanes[i])
+                 for i in range(count)]
+        same_lane = [[j for j in order[:k] if lanes[j] == lanes[i]]
+                     for k, i in enumerate(order)]
+        positions = [0] * count
+
+        def place(k, occupied, key):
+            if k == count:
+                yield Problem.from_state(layout, tuple(positions),
+                                         occupied, key,
+                                         layout.encode(positions))
+                return
+            i = order[k]
+            if i == goal:
+                choices = [layout.goal_position]
+            else:
+                choices = range(len(layout.masks[i]))
+            for p in choices:
+                mask = layout.masks[i][p]
+                if occupied & mask:
+                    continue
+                if any((positions[j] < p) != (start[j] < start[i])
+                       for j in same_lane[k]):
+                    continue
+                positions[i] = p
+                yield from place(k + 1, occupied | mask,
+                                 key ^ layout.keys[i][p])
+
+        yield from place(0, layout.walls, 0)
+
+    def successors(self):
+        """Return iterator of (move, board) pairs for the next possible moves.
+
+        A move is a (vehicle id, direction) tuple, direction being one of
+        L, R, U or D.
+        """
+        layout = self.layout
+        ids = layout.ids
+        positions = self.positions
+        occupied = self.occupied
+        key = self.key
+        code = self.code
+        from_state = Problem.from_state
+        for i, slides in enumerate(layout.slides):
+            for direction, p, free, flip, key_flip, code_flip in \
+                    slides[positions[i]]:
+                if not occupied & free:
+                    yield ((ids[i], direction),
+                           from_state(layout,
+                                      positions[:i] + (p,) + positions[i + 1:],
+                                      occupied ^ flip, key ^ key_flip,
+                                      code ^ code_flip))
+
+    def slide_successors(self):
+        """Return iterator of (move, board) pairs for the next possible moves
+        when a move slides one vehicle any number of free cells.
+
+        A move is a (vehicle id, direction, distance in cells) tuple.
+        """
+        layout = self.layout
+        ids = layout.ids
+        positions = self.positions
+        occupied = self.occupied
+        key = self.key
+        code = self.code
+        from_state = Problem.from_state
+        for i, runs in enumerate(layout.runs):
+            for run in runs[positions[i]]:
+                for direction, p, free, flip, key_flip, code_flip, distance \
+                        in run:
+                    if occupied & free:
+                        break   # Blocked from here on
+                    yield ((ids[i], direction, distance),
+                           from_state(layout,
+                                      positions[:i] + (p,) + positions[i + 1:],
+                                      occupied ^ flip, key ^ key_flip,
+                                      code ^ code_flip))
 
     def moves(self):
         """Return iterator of next possible moves."""
-        board = self.get_board()
-        for v in sorted(list(self.vehicles)):
-            if v.orientation == 'H':
-                if v.x - 1 >= 0 and board[v.y][v.x - 1] == ' ':
-                    new_v = Vehicle(v.id, v.x - 1, v.y, v.orientation)
-                    new_vehicles = self.vehicles.copy()
-                    new_vehicles.remove(v)
-                    new_vehicles.add(new_v)
-                    yield Problem(new_vehicles)
-                if v.x + v.length <= 5 and board[v.y][v.x + v.length] == ' ':
-                    new_v = Vehicle(v.id, v.x + 1, v.y, v.orientation)
-                    new_vehicles = self.vehicles.copy()
-                    new_vehicles.remove(v)
-                    new_vehicles.add(new_v)
-                    yield Problem(new_vehicles)
-            else:
-                if v.y - 1 >= 0 and board[v.y - 1][v.x] == ' ':
-                    new_v = Vehicle(v.id, v.x, v.y - 1, v.orientation)
-                    new_vehicles = self.vehicles.copy()
-                    new_vehicles.remove(v)
-                    new_vehicles.add(new_v)
-                    yield Problem(new_vehicles)
-                if v.y + v.length <= 5 and board[v.y + v.length][v.x] == ' ':
-                    new_v = Vehicle(v.id, v.x, v.y + 1, v.orientation)
-                    new_vehicles = self.vehicles.copy()
-                    new_vehicles.remove(v)
-                    new_vehicles.add(new_v)
-                    yield Problem(new_vehicles)
+        for _, board in self.successors():
+            yield board
 
 
 def load_file(rushhour_file):
+    """Read a Problem from the lines of a map file.
+
+    A classic line such as X12H holds a one letter id, single digit x and
+    y and the orientation. Larger boards use fields separated by spaces:
+
+        size 8 8        width and height (default 6 6)
+        wall 3 4        a wall cell, one line each
+        exit R 3        the side and lane of the exit (default: right end
+                        of the row of X)
+        X 1 3 H         a vehicle: id, x, y, orientation and, for ids
+        bus7 0 0 V 4    other than the classic ones, its length
+
+    Blank lines are skipped.
+
+    Exceptions:
+        ValueError: on a line that is not valid
+    """
     vehicles = []
+    size = (SIZE, SIZE)
+    walls = []
+    exit = None
     for line in rushhour_file:
-        line = line[:-1] if line.endswith('\n') else line
-        id, x, y, orientation = line
-        vehicles.append(Vehicle(id, int(x), int(y), orientation))
-    return Problem(set(vehicles))
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            if fields[0] == 'size':
+                size = (int(fields[1]), int(fields[2]))
+            elif fields[0] == 'wall':
+                walls.append((int(fields[1]), int(fields[2])))
+            elif fields[0] == 'exit':
+                exit = (fields[1], int(fields[2]))
+            elif len(fields) == 1:
+                id, x, y, orientation = fields[0]
+                vehicles.append(Vehicle(id, int(x), int(y), orientation))
+            else:
+                id, x, y, orientation = fields[:4]
+                length = int(fields[4]) if len(fields) > 4 else None
+                vehicles.append(Vehicle(id, int(x), int(y), orientation,
+                                        length))
+        except (IndexError, ValueError) as e:
+            raise ValueError('Invalid map line {0!r}: {1}'.format(
+                line.strip(), e))
+    geometry = None
+    if size != (SIZE, SIZE) or walls or exit is not None:
+        geometry = Geometry(size[0], size[1], walls, exit)
+    return Problem(set(vehicles), geometry)
+
+
+def map_lines(problem):
+    """Lines of a map file that load_file() reads back as problem; classic
+    boards are written in the classic format."""
+    geometry = problem.layout.geometry
+    vehicles = sorted(problem.vehicles)
+    lines = []
+    if geometry == CLASSIC and all(
+            v.length == default_length(v.id) and len(v.id) == 1
+            for v in vehicles):
+        return ['{0}{1}{2}{3}'.format(v.id, v.x, v.y, v.orientation)
+                for v in vehicles]
+    if (geometry.width, geometry.height) != (SIZE, SIZE):
+        lines.append('size {0} {1}'.format(geometry.width, geometry.height))
+    lines.extend('wall {0} {1}'.format(x, y) for x, y in geometry.walls)
+    if geometry.exit is not None:
+        lines.append('exit {0} {1}'.format(*geometry.exit))
+    for v in vehicles:
+        line = '{0} {1} {2} {3}'.format(v.id, v.x, v.y, v.orientation)
+        if v.length != default_length(v.id):
+            line += ' {0}'.format(v.length)
+        lines.append(line)
+    return lines
 
 def solution_steps(solution):
-    """Generate list of steps from a solution path."""
-    steps = []
-    for i in range(len(solution) - 1):
-        r1, r2 = solution[i], solution[i + 1]
-        v1 = list(r1.vehicles - r2.vehicles)[0]
-        v2 = list(r2.vehicles - r1.vehicles)[0]
-        if v1.x < v2.x:
-            steps.append('{0}R'.format(v1.id))
-        elif v1.x > v2.x:
-            steps.append('{0}L'.format(v1.id))
-        elif v1.y < v2.y:
-            steps.append('{0}D'.format(v1.id))
-        elif v1.y > v2.y:
-            steps.append('{0}U'.format(v1.id))
-    return steps
+    """Generate list of steps from a solution path of search Nodes, such as
+    AR for a one cell move or AR3 for a slide of three cells."""
+    return [''.join(str(part) for part in node.move) for node in solution[1:]]
+
+
+def solution_cost(solution, cost='length'):
+    """Cost of a solution path under one of the cost models in COSTS, by
+    default the vehicle length times the cells moved."""
+    if not solution:
+        return 0
+    layout = solution[0].state.layout
+    move_cost = COSTS[cost]
+    return sum(move_cost(layout, node.move) for node in solution[1:])
 
 
 if __name__ == '__main__':
-    filename = sys.argv[1]
-    with open(filename) as rushhour_file:
+    from cache import COST_MODELS, SolutionCache
+    from feasibility import check
+
+    """syntax: python problem.py map/p1 a* [--model slide] [--cost cells]
+                                          [--no-cache] [--no-check]
+                                          [--weight 2] [--deadline 1.5]
+                                          [--width 64] [--max-nodes N]
+                                          [--time-limit S] [--max-open N]
+                                          [--max-memory MB]"""
+
+    parser = argparse.ArgumentParser(description='Solve a Rush Hour map.')
+    parser.add_argument('map')
+    parser.add_argument('algorithm', nargs='?', default='a*',
+                        choices=list(SOLVERS),
+                        help='search to run (default a*); lbfs is bfs one '
+                             'layer at a time over packed state codes')
+    parser.add_argument('--model', default='step', choices=MOVE_MODELS,
+                        help='step: one cell per move, slide: any distance '
+                             '(bfs, ucs and a* only)')
+    parser.add_argument('--cost', default=None, choices=list(COSTS),
+                        help='cost model of ucs and a* (default length)')
+    parser.add_argument('--weight', type=float, default=None,
+                        help='heuristic weight of awa* (default 2)')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='seconds awa* may search for')
+    parser.add_argument('--width', type=int, default=None,
+                        help='states kept per layer by beam (default 64)')
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help='stop after expanding this many states')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='stop after this many seconds')
+    parser.add_argument('--max-open', type=int, default=None,
+                        help='stop when more states than this are waiting')
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help='stop when the process is using this many MB')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--no-check', action='store_true',
+                        help='search without first proving the map '
+                             'solvable')
+    args = parser.parse_args()
+    algorithm = args.algorithm
+
+    with open(args.map) as rushhour_file:
         problem = load_file(rushhour_file)
 
-    algorithm = sys.argv[2] if len(sys.argv) > 2 else 'a*'
+    options = dict()
+    if args.model != 'step':
+        options['model'] = args.model
+    if args.cost is not None:
+        options['cost'] = args.cost
+    for name in ('weight', 'deadline', 'width'):
+        if getattr(args, name) is not None:
+            options[name] = getattr(args, name)
+    cost = args.cost or COST_MODELS.get(algorithm, 'unit')
 
-    """syntax: python main.py map/p1 a*"""
+    # Entries do not record the weight, deadline or width they came from
+    tuned = {'weight', 'deadline', 'width'} & set(options)
+    cache = None if args.no_cache or tuned else SolutionCache()
+    results = None if cache is None else cache.get(problem, algorithm, cost,
+                                                   args.model)
+    if results is not None:
+        print(f"{len(results['solutions'])} Solutions found (cached)")
+        for solution in results['solutions']:
+            print('Solution:', ', '.join(solution_steps(solution)))
+        print(f"{results['visited']} Nodes visited when first solved")
+        sys.exit()
 
-    tracemalloc.start()
-    start_time = time.time()
+    def progress(stats):
+        print(f"... {stats.expanded} expanded, {stats.peak_open} peak open, "
+              f"{stats.elapsed:.1f}s", file=sys.stderr)
 
-    if algorithm == 'bfs':
-        results = bfs(problem)
-    elif algorithm == 'dfs':
-        results = dfs(problem)
-    elif algorithm == 'ucs':
-        results = ucs(problem)
-    elif algorithm == 'a*':
-        results = a_star_solver(problem)
-    elif algorithm == 'dls':
-        results =  dls(problem)
+    stats = Budget(args.max_nodes, args.time_limit, args.max_open,
+                   None if args.max_memory is None else args.max_memory * 1024,
+                   every=100000, callback=progress)
+    if not args.no_check:
+        # The walk of the component counts against the same limits; past
+        # max_nodes states it gives up and leaves the answer to the search
+        try:
+            verdict = check(problem, limit=args.max_nodes, budget=stats)
+        except BudgetExhausted as e:
+            print(f"Search stopped: {e.reason} budget used up while "
+                  f"checking the map")
+            sys.exit()
+        if verdict['solvable'] is False:
+            print(f"0 Solutions found: unsolvable, {verdict['reason']}")
+            sys.exit()
+    search = SOLVERS[algorithm]
+    if not set(options) <= set(inspect.signature(search).parameters):
+        sys.exit('{0} does not take {1}'.format(
+            algorithm, ', '.join('--' + name for name in sorted(
+                set(options) - set(inspect.signature(search).parameters)))))
+    results = stats.run(search, problem, **options)
+    elapsed = stats.elapsed
+    if cache is not None and results['stopped'] is None:
+        cache.put(problem, algorithm, results, cost, args.model)
 
-    end_time = time.time()
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
+    if results['stopped'] is not None:
+        print(f"Search stopped: {results['stopped']} budget used up")
+        if results['best_state'] is not None:
+            print('Nearest board to the goal reached:')
+            print(results['best_state'], end='')
 
     print(f"{len(results['solutions'])} Solutions found")
     for solution in results['solutions']:
         print('Solution:', ', '.join(solution_steps(solution)))
 
-    print(f"{len(results['visited'])} Nodes visited")
-    print(f"Time taken: {end_time - start_time:.4f} seconds")
-    print(f"Peak memory used: {peak / 1024:.2f} KB")
\ No newline at end of file
+    if results.get('bound') is not None:
+        print(f"Cost within {results['bound']:.3f} times the optimum")
+    print(f"{results['visited']} Nodes visited")
+    print(f"{stats.expanded} expanded, {stats.generated} generated, "
+          f"{stats.duplicates} duplicates, {stats.peak_open} peak open")
+    print(f"Time taken: {elapsed:.4f} seconds (moves {stats.moves_time:.4f}, "
+          f"hashing {stats.hash_time:.4f}, "
+          f"heuristic {stats.heuristic_time:.4f})")
+    try:
+        import resource   # Unix only
+    except ImportError:
+        sys.exit()
+    # Peak resident set of the process, in KB on Linux
+    print(f"Peak memory used: "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} KB")
\ No newline at end of file
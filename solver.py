@@ -1,13 +1,150 @@
-from collections import deque
 import heapq
+import time
+from array import array
+from collections import deque
+from fractions import Fraction
+
+from closed import ClosedList
 
 """python main.py Map/p1 a*"""
-def bfs(initilia_state, max_depth=100):
+
+
+class Node(object):
+    """A search node: a board, the node it was reached from and the move
+    (vehicle id, direction) that led to it.
+
+    Frontiers hold nodes instead of whole paths; a path is only rebuilt
+    with path() for the solutions that are returned.
+    """
+
+    __slots__ = ('state', 'parent', 'move', 'depth')
+
+    def __init__(self, state, parent=None, move=None):
+        self.state = state
+        self.parent = parent
+        self.move = move
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    def path(self):
+        """Tuple of nodes from the initial board to this one."""
+        nodes = []
+        node = self
+        while node is not None:
+            nodes.append(node)
+            node = node.parent
+        return tuple(reversed(nodes))
+
+
+class BucketQueue(object):
+    """Priority queue for small non-negative integer priorities.
+
+    Entries are kept in one bucket per f value; inside a bucket they are
+    grouped by g, the deepest g is served first and equal g values come out
+    in insertion order. Push and pop never compare the stored items.
+    Stale entries are left in place and skipped by the caller on pop.
+    """
+
+    def __init__(self):
+        self.buckets = []   # buckets[f]: dict of g -> deque of items
+        self.min = 0        # no bucket below this one holds an entry
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, f, g, item):
+        buckets = self.buckets
+        while len(buckets) <= f:
+            buckets.append({})
+        level = buckets[f].get(g)
+        if level is None:
+            level = buckets[f][g] = deque()
+        level.append(item)
+        if f < self.min:
+            self.min = f
+        self.size += 1
+
+    def pop(self):
+        """Remove and return the (f, g, item) entry with the lowest f."""
+        if not self.size:
+            raise IndexError('pop from an empty BucketQueue')
+        buckets = self.buckets
+        while not buckets[self.min]:
+            self.min += 1
+        bucket = buckets[self.min]
+        g = max(bucket)
+        level = bucket[g]
+        item = level.popleft()
+        if not level:
+            del bucket[g]
+        self.size -= 1
+        return self.min, g, item
+
+    def entries(self):
+        """Iterate over the (f, g, item) entries, in no particular order."""
+        for f in range(self.min, len(self.buckets)):
+            for g, level in self.buckets[f].items():
+                for item in level:
+                    yield f, g, item
+
+
+MOVE_MODELS = ('step', 'slide')
+"""Move models: 'step' moves a vehicle one cell, 'slide' any number of free
+cells in one move."""
+
+
+def _slide(model):
+    """True for the slide move model.
+
+    Exceptions:
+        ValueError: on an unknown move model
+    """
+    if model not in MOVE_MODELS:
+        raise ValueError('Unknown move model {0}'.format(model))
+    return model == 'slide'
+
+
+def _distance(move):
+    """Cells covered by a move: (id, direction) or (id, direction, cells)."""
+    return move[2] if len(move) > 2 else 1
+
+
+COSTS = {
+    'unit': lambda layout, move: 1,
+    'cells': lambda layout, move: _distance(move),
+    'length': lambda layout, move: layout.length_of[move[0]] * _distance(move),
+}
+"""Cost models, each a function of the layout and the move: 'unit' counts
+moves, 'cells' counts the cells moved and 'length' the cells moved times
+the length of the vehicle."""
+
+
+def _closed_list(closed, stats, layout):
+    """The closed list of a search: closed or else a new ClosedList, or a
+    set of boards when the state codes of layout do not fit a ClosedList,
+    timed when stats are kept."""
+    if closed is None:
+        closed = ClosedList() if layout.code_bits < 64 else set()
+    return closed if stats is None else stats.closed(closed)
+
+
+def _successors(board, stats, slide=False):
+    """board.successors(), or board.slide_successors() if slide, timed and
+    counted when stats are kept."""
+    if stats is not None:
+        return iter(stats.successors(board, slide))
+    if slide:
+        return board.slide_successors()
+    return board.successors()
+
+
+def bfs(initilia_state, max_depth=100, stats=None, closed=None,
+        model='step'):
     """
     Find solutions to given Problem board using breadth first search.
     Returns a dictionary with named fields:
         visited: the number of configurations visited in the search
-        solutions: paths to the goal state
+        solutions: paths to the goal state, as tuples of Nodes
         depth_states: the number of states visited at each depth
 
     Arguments:
@@ -15,202 +152,836 @@ def bfs(initilia_state, max_depth=100):
 
     Keyword Arguments:
         max_depth: Maximum depth to traverse in search (default=25)
+        stats: a stats.SearchStats to fill in (default=None)
+        closed: the closed list to use, see the closed module
+            (default=a new ClosedList)
+        model: one of MOVE_MODELS (default='step')
     """
-    visited = set()
+    slide = _slide(model)
+    visited = _closed_list(closed, stats, initilia_state.layout)
     solutions = list()
     depth_states = dict()
 
     queue = deque()
-    queue.appendleft((initilia_state, tuple()))
+    queue.appendleft(Node(initilia_state))
     while len(queue) != 0:
-        board, path = queue.pop()
-        new_path = path + tuple([board])
+        node = queue.pop()
+        board = node.state
+        depth = node.depth + 1
 
-        depth_states[len(new_path)] = depth_states.get(len(new_path), 0) + 1
+        depth_states[depth] = depth_states.get(depth, 0) + 1
 
-        if len(new_path) >= max_depth:
+        if depth >= max_depth:
             break
 
         if board in visited:
+            if stats is not None:
+                stats.duplicates += 1
             continue
         else:
             visited.add(board)
+        if stats is not None:
+            stats.expand(len(queue), board)
 
         if board.solved():
-            solutions.append(new_path)
+            solutions.append(node.path())
         else:
-            queue.extendleft((move, new_path) for move in board.moves())
+            queue.extendleft(Node(move, node, step)
+                             for step, move in _successors(board, stats,
+                                                           slide))
+
+    return {'visited': len(visited),
+            'solutions': solutions,
+            'depth_states': depth_states}
+
+
+def _code_moves(layout, slide):
+    """Slides of every vehicle by position, for searches over state codes.
+
+    moves[i][p] is a tuple of runs, each a tuple of (move, cells that must
+    be free, occupancy bits to flip, code bits to flip) to be tried in
+    order until one is blocked.
+    """
+    moves = []
+    for i, vid in enumerate(layout.ids):
+        by_position = []
+        for p in range(len(layout.masks[i])):
+            if slide:
+                runs = tuple(
+                    tuple(((vid, direction, distance), free, flip, code_flip)
+                          for direction, _, free, flip, _, code_flip, distance
+                          in run)
+                    for run in layout.runs[i][p])
+            else:
+                runs = tuple((((vid, direction), free, flip, code_flip),)
+                             for direction, _, free, flip, _, code_flip
+                             in layout.slides[i][p])
+            by_position.append(runs)
+        moves.append(tuple(by_position))
+    return tuple(moves)
+
+
+def layered_bfs(initial_state, max_depth=100, stats=None, model='step'):
+    """
+    Breadth first search one whole layer at a time over packed state codes.
+    Returns the same dictionary as bfs, with the same solutions in the same
+    order: a layer is kept in the order bfs would pop it, and each state
+    keeps the first parent that reached it.
+
+    A layer is a list of (state code, occupancy mask) pairs. Children are
+    made by XOR with precomputed slide masks, checked against one set of
+    every code seen, and linked to their parent by code; Problem and Node
+    objects are only built for the solution paths. The layer is walked
+    state by state in plain Python, not with array operations: the gain
+    over bfs comes from the packed codes alone.
+
+    Keyword Arguments:
+        max_depth: Maximum depth to traverse in search (default=100)
+        stats: a stats.SearchStats to fill in (default=None)
+        model: one of MOVE_MODELS (default='step')
+    """
+    slide = _slide(model)
+    layout = initial_state.layout
+    moves = _code_moves(layout, slide)
+    shifts = tuple(enumerate(layout.shifts))
+    position_mask = layout.position_mask
+    goal = layout.goal
+    if goal is not None:
+        goal_shift = layout.shifts[goal]
+        goal_position = layout.goal_position
+
+    start = initial_state.code
+    parents = {start: None}   # code -> (parent code, move), None at start
+    layer = [(start, initial_state.occupied)]
+    depth_states = {1: 1}
+    goals = []
+    visited = 0
+    depth = 1
+    # bfs stops as soon as it pops a node max_depth deep
+    while layer and depth < max_depth:
+        visited += len(layer)
+        next_layer = []
+        generated = 0
+        for code, occupied in layer:
+            if stats is not None:
+                stats.expand(len(layer) + len(next_layer))
+            if (goal is not None and
+                    (code >> goal_shift) & position_mask == goal_position):
+                goals.append(code)
+                continue
+            for i, shift in shifts:
+                for run in moves[i][(code >> shift) & position_mask]:
+                    for move, free, flip, code_flip in run:
+                        if occupied & free:
+                            break
+                        generated += 1
+                        child = code ^ code_flip
+                        if child in parents:
+                            continue
+                        parents[child] = (code, move)
+                        next_layer.append((child, occupied ^ flip))
+        if stats is not None:
+            stats.generated += generated
+            stats.duplicates += generated - len(next_layer)
+        depth += 1
+        if generated:
+            depth_states[depth] = 1 if depth >= max_depth else generated
+        layer = next_layer
+
+    # Build the Nodes of the solution paths, sharing common prefixes
+    nodes = {start: Node(initial_state)}
+    solutions = []
+    for goal_code in goals:
+        path = []
+        code = goal_code
+        while code not in nodes:
+            parent, move = parents[code]
+            path.append((code, move))
+            code = parent
+        node = nodes[code]
+        for code, move in reversed(path):
+            node = nodes[code] = Node(layout.state(layout.decode(code)),
+                                      node, move)
+        solutions.append(node.path())
 
     return {'visited': visited,
             'solutions': solutions,
             'depth_states': depth_states}
 
 
-def ucs(initial_state):
+REVERSE = {'L': 'R', 'R': 'L', 'U': 'D', 'D': 'U'}
+"""The direction that undoes a move in each direction."""
+
+
+def bidirectional_bfs(initial_state, stats=None):
+    """
+    Find a shortest solution (in moves) to the given Problem board by
+    breadth first search from both ends: forward from the board and
+    backward from every goal state with the same vehicles. The frontier
+    with fewer states is grown one full layer at a time until the two
+    searches meet. The goal states are all made before the search starts,
+    and their number grows quickly with the free cells of the board, so
+    this suits the classic board rather than large ones.
+    Returns a dictionary with named fields:
+        visited: the number of configurations visited by both searches
+        solutions: a list with the shortest path, as a tuple of Nodes
+        depth_states: the number of states first reached at each depth
+            of the forward search
+
+    Keyword Arguments:
+        stats: a stats.SearchStats to fill in (default=None)
+    """
+    # Nodes reached by each search; a backward node's parent is one move
+    # closer to the goal and its move leads from the parent to it.
+    forward = {initial_state: Node(initial_state)}
+    backward = {goal: Node(goal) for goal in initial_state.goal_states()}
+    if stats is not None:
+        forward = stats.closed(forward)
+        backward = stats.closed(backward)
+    depth_states = {1: 1}
+    forward_frontier = [initial_state]
+    backward_frontier = list(backward)
+
+    meeting = initial_state if initial_state in backward else None
+    while meeting is None and forward_frontier and backward_frontier:
+        grow_forward = len(forward_frontier) <= len(backward_frontier)
+        if grow_forward:
+            frontier, reached, other = forward_frontier, forward, backward
+            other_frontier = backward_frontier
+        else:
+            frontier, reached, other = backward_frontier, backward, forward
+            other_frontier = forward_frontier
+
+        next_frontier = []
+        best = None
+        for board in frontier:
+            node = reached[board]
+            if stats is not None:
+                stats.expand(len(frontier) + len(other_frontier), board)
+            for step, move in _successors(board, stats):
+                if move in reached:
+                    if stats is not None:
+                        stats.duplicates += 1
+                    continue
+                reached[move] = Node(move, node, step)
+                next_frontier.append(move)
+                if move in other:
+                    length = reached[move].depth + other[move].depth
+                    if best is None or length < best[0]:
+                        best = (length, move)
+
+        if grow_forward:
+            forward_frontier = next_frontier
+            if next_frontier:
+                depth = reached[next_frontier[0]].depth + 1
+                depth_states[depth] = len(next_frontier)
+        else:
+            backward_frontier = next_frontier
+        if best is not None:
+            meeting = best[1]
+
+    visited = len(forward.keys() | backward.keys())
+    if meeting is None:
+        return {'visited': visited,
+                'solutions': [],
+                'depth_states': depth_states}
+
+    # Follow the backward nodes to the goal, undoing each of their moves
+    node = forward[meeting]
+    back = backward[meeting]
+    while back.parent is not None:
+        vid, direction = back.move
+        node = Node(back.parent.state, node, (vid, REVERSE[direction]))
+        back = back.parent
+    return {'visited': visited,
+            'solutions': [node.path()],
+            'depth_states': depth_states}
+
+
+def ucs(initial_state, stats=None, closed=None, model='step',
+        cost='length'):
     """
     Find solutions to the given problem board using Uniform Cost Search.
     Returns a dictionary with named fields:
-        visited: the set of configurations visited in the search
-        solutions: a list of paths to the goal state
+        visited: the number of configurations visited in the search
+        solutions: a list of paths to the goal state, as tuples of Nodes
+
+    Keyword Arguments:
+        stats: a stats.SearchStats to fill in (default=None)
+        closed: the closed list to use, see the closed module
+            (default=a new ClosedList)
+        model: one of MOVE_MODELS (default='step')
+        cost: name of the cost model in COSTS (default='length')
     """
-    visited = set()
+    slide = _slide(model)
+    move_cost = COSTS[cost]
+    visited = _closed_list(closed, stats, initial_state.layout)
     solutions = list()
+    layout = initial_state.layout
 
-    # Priority queue stores tuples of (cost, path, board)
-    priority_queue = [(0, [initial_state], initial_state)]
+    # Priority queue of nodes keyed by cost
+    priority_queue = BucketQueue()
+    priority_queue.push(0, 0, Node(initial_state))
 
     while priority_queue:
-        cost, path, board = heapq.heappop(priority_queue)
+        g, _, node = priority_queue.pop()
+        board = node.state
 
         if board in visited:
+            if stats is not None:
+                stats.duplicates += 1
             continue
 
         visited.add(board)
+        if stats is not None:
+            stats.expand(len(priority_queue), board)
 
         if board.solved():
-            solutions.append(path)
-            # Since we want to find all solutions, we continue searching
-            # If we only wanted the optimal solution, we could break here
+            solutions.append(node.path())
+            # Later goals cost at least as much, and states are closed on
+            # first visit, so this misses equal-cost alternatives; see
+            # optimal.SolutionDag for every optimal solution
             continue
 
-        for move in board.moves():
+        for step, move in _successors(board, stats, slide):
             if move not in visited:
-                moved_vehicle = list(board.vehicles - move.vehicles)[0]
-                new_cost = cost + moved_vehicle.length
-                new_path = path + [move]
-                heapq.heappush(priority_queue, (new_cost, new_path, move))
+                new_cost = g + move_cost(layout, step)
+                priority_queue.push(new_cost, new_cost, Node(move, node, step))
 
-    return {'visited': visited, 'solutions': solutions}
+    return {'visited': len(visited), 'solutions': solutions}
 
 def heuristic(state):
     """
     Heuristic function for A*:
-    Returns the number of vehicles blocking the red car ('X') from reaching the exit.
+    Returns the number of occupied cells between the red car ('X') and the exit.
     """
-    board = state.get_board()
-    for v in state.vehicles:
-        if v.id == 'X':
-            red = v
-            break
-    else:
+    layout = state.layout
+    if layout.goal is None:
         return float('inf')  # X not found
-
-    count = 0
-    y = red.y
-    x_end = red.x + red.length
-    for x in range(x_end, 6):  # Check cells to the right of red car
-        if board[y][x] != ' ':
-            count += 1
-    return count
+    exit_mask = layout.exit_masks[state.positions[layout.goal]]
+    return (state.occupied & exit_mask).bit_count()
 
 
-def a_star_solver(initial_state):
+def a_star_solver(initial_state, heuristic=heuristic, stats=None,
+                  closed=None, model='step', cost='length'):
     """
     A* search for solving the Rush Hour puzzle.
     Returns a dictionary with:
-        'visited': set of visited states
-        'solutions': list of solution paths
+        'visited': number of visited states
+        'solutions': list of solution paths, as tuples of Nodes
         'depth_states': dict mapping depth -> number of states
+
+    Keyword Arguments:
+        heuristic: admissible estimate of the remaining cost of a state
+            under the cost model; float('inf') marks a dead end. The
+            default is admissible under all three, the heuristics module
+            ones only under 'length' (default=heuristic)
+        stats: a stats.SearchStats to fill in (default=None)
+        closed: the closed list to use, see the closed module
+            (default=a new ClosedList)
+        model: one of MOVE_MODELS (default='step')
+        cost: name of the cost model in COSTS (default='length')
     """
 
-    visited = set()
+    slide = _slide(model)
+    move_cost = COSTS[cost]
+    visited = _closed_list(closed, stats, initial_state.layout)
     solutions = []
     depth_states = dict()
-
-    # Priority queue: (f = g + h, g = cost, path, current_state)
-    queue = []
-    heapq.heappush(queue, (heuristic(initial_state), 0, [initial_state], initial_state))
+    layout = initial_state.layout
+    if stats is not None:
+        heuristic = stats.timed(heuristic)
+
+    h = heuristic(initial_state)
+    if h == float('inf'):
+        # The goal cannot be reached from the initial state
+        return {
+            'visited': len(visited),
+            'solutions': [],
+            'depth_states': depth_states
+        }
+
+    # Priority queue of nodes keyed by f = g + h, deepest g first on ties
+    queue = BucketQueue()
+    queue.push(h, 0, Node(initial_state))
 
     while queue:
-        f, g, path, board = heapq.heappop(queue)
-        depth = len(path)
+        f, g, node = queue.pop()
+        board = node.state
+        depth = node.depth + 1
         depth_states[depth] = depth_states.get(depth, 0) + 1
 
         if board in visited:
+            if stats is not None:
+                stats.duplicates += 1
             continue
         visited.add(board)
+        if stats is not None:
+            stats.expand(len(queue), board)
 
         if board.solved():
-            solutions.append(path)
+            solutions.append(node.path())
             return {
-                'visited': visited,
+                'visited': len(visited),
                 'solutions': solutions,
                 'depth_states': depth_states
             }
 
-        for move in board.moves():
+        for step, move in _successors(board, stats, slide):
             if move not in visited:
-                # Find which vehicle moved to compute cost
-                moved_vehicle = list(board.vehicles - move.vehicles)[0]
-                move_cost = moved_vehicle.length
-                new_g = g + move_cost
-                new_f = new_g + heuristic(move)
-                heapq.heappush(queue, (new_f, new_g, path + [move], move))
+                new_g = g + move_cost(layout, step)
+                h = heuristic(move)
+                if h == float('inf'):
+                    continue  # Dead end, the goal cannot be reached
+                queue.push(new_g + h, new_g, Node(move, node, step))
 
     return {
-        'visited': visited,
+        'visited': len(visited),
         'solutions': [],
         'depth_states': depth_states
     }
 
 
+def anytime_a_star(initial_state, weight=2, deadline=None,
+                   heuristic=heuristic, stats=None, model='step',
+                   cost='length'):
+    """
+    Anytime weighted A*: a good solution fast, then better ones.
+
+    States are expanded in order of g + weight * h, so the first solution
+    costs at most weight times the optimum. The search then goes on,
+    reopening states reached more cheaply and dropping those whose g + h
+    cannot beat the best solution, until the open list runs out, which
+    proves the best solution optimal, or the deadline passes. Each better
+    solution is reported to stats.improve().
+    Returns a dictionary with:
+        'visited': number of states expanded
+        'solutions': the solutions found, best first, as tuples of Nodes
+        'depth_states': dict mapping depth -> number of states
+        'bound': proven ratio of the cost of the best solution to the
+            optimal cost, 1.0 once it is optimal; None without a solution
+
+    Keyword Arguments:
+        weight: factor of the heuristic, at least 1; 1 is plain A*
+            (default=2)
+        deadline: seconds to search for, or None to search until the best
+            solution is proven optimal (default=None)
+        heuristic: admissible estimate of the remaining cost, as for
+            a_star_solver (default=heuristic)
+        stats: a stats.SearchStats to fill in (default=None)
+        model: one of MOVE_MODELS (default='step')
+        cost: name of the cost model in COSTS (default='length')
+
+    Exceptions:
+        ValueError: on a weight below 1
+    """
+    if weight < 1:
+        raise ValueError('Weight must be at least 1, not {0}'.format(weight))
+    slide = _slide(model)
+    move_cost = COSTS[cost]
+    layout = initial_state.layout
+    if stats is not None:
+        heuristic = stats.timed(heuristic)
+    start_time = time.monotonic()
+    # BucketQueue priorities must be integers: with weight = num / den,
+    # den * g + num * h orders states like g + weight * h
+    weight = Fraction(weight).limit_denominator(100)
+    num, den = weight.numerator, weight.denominator
+
+    best_g = dict()   # state code -> cheapest g it was reached with
+    solutions = []
+    depth_states = dict()
+    incumbent = float('inf')
+    expanded = 0
+    queue = BucketQueue()
+    h = heuristic(initial_state)
+    if h != float('inf'):
+        best_g[initial_state.code] = 0
+        queue.push(num * h, 0, (h, Node(initial_state)))
+
+    while queue:
+        if (deadline is not None and expanded % 256 == 0 and
+                time.monotonic() - start_time >= deadline):
+            break
+        _, g, (h, node) = queue.pop()
+        board = node.state
+        if best_g[board.code] < g or g + h >= incumbent:
+            continue   # Reached more cheaply since, or cannot do better
+        expanded += 1
+        depth = node.depth + 1
+        depth_states[depth] = depth_states.get(depth, 0) + 1
+        if stats is not None:
+            stats.expand(len(queue), board)
+
+        if board.solved():
+            incumbent = g
+            solutions.append(node.path())
+            if stats is not None:
+                stats.improve(solutions[-1])
+            continue
+
+        for step, move in _successors(board, stats, slide):
+            new_g = g + move_cost(layout, step)
+            if new_g >= best_g.get(move.code, float('inf')):
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            h = heuristic(move)
+            if new_g + h >= incumbent:
+                continue   # Also drops dead ends, where h is infinite
+            best_g[move.code] = new_g
+            queue.push(den * new_g + num * h, new_g,
+                       (h, Node(move, node, step)))
+
+    bound = None
+    if solutions:
+        # The optimum is at least the lowest g + h left open
+        lowest = min((g + h for _, g, (h, node) in queue.entries()
+                      if best_g[node.state.code] == g and g + h < incumbent),
+                     default=incumbent)
+        bound = float(weight)
+        if lowest > 0:
+            bound = min(bound, incumbent / lowest)
+        elif incumbent == 0:
+            bound = 1.0
+    solutions.reverse()
+    return {'visited': expanded,
+            'solutions': solutions,
+            'depth_states': depth_states,
+            'bound': bound}
+
+
+def beam_search(initial_state, width=64, max_depth=1000,
+                heuristic=heuristic, stats=None, model='step',
+                cost='length'):
+    """
+    Beam search: breadth first, keeping only the width states of each
+    layer with the lowest g + h. Time and memory grow with width times
+    the solution length whatever the puzzle, but the solution found is
+    not optimal, and none may be found even when one exists.
+    Returns a dictionary with:
+        'visited': number of states expanded
+        'solutions': list with the cheapest solution of the first layer
+            that holds one, or empty
+        'depth_states': dict mapping depth -> number of states kept
+
+    Keyword Arguments:
+        width: states kept in each layer (default=64)
+        max_depth: most layers to search (default=1000)
+        heuristic: estimate of the remaining cost, as for a_star_solver
+            (default=heuristic)
+        stats: a stats.SearchStats to fill in (default=None)
+        model: one of MOVE_MODELS (default='step')
+        cost: name of the cost model in COSTS (default='length')
+    """
+    slide = _slide(model)
+    move_cost = COSTS[cost]
+    layout = initial_state.layout
+    if stats is not None:
+        heuristic = stats.timed(heuristic)
+
+    seen = {initial_state.code}   # every state kept in a layer so far
+    layer = [(0, Node(initial_state))]
+    depth_states = {1: 1}
+    expanded = 0
+    depth = 1
+    while layer and depth < max_depth:
+        goals = [(g, node) for g, node in layer if node.state.solved()]
+        if goals:
+            g, node = min(goals, key=lambda goal: goal[0])
+            return {'visited': expanded,
+                    'solutions': [node.path()],
+                    'depth_states': depth_states}
+
+        children = dict()   # state code -> (f, g, Node), the cheapest one
+        for g, node in layer:
+            expanded += 1
+            if stats is not None:
+                stats.expand(len(layer) + len(children), node.state)
+            for step, move in _successors(node.state, stats, slide):
+                new_g = g + move_cost(layout, step)
+                old = children.get(move.code)
+                if move.code in seen or (old is not None and
+                                         old[1] <= new_g):
+                    if stats is not None:
+                        stats.duplicates += 1
+                    continue
+                h = heuristic(move)
+                if h != float('inf'):
+                    children[move.code] = (new_g + h, new_g,
+                                           Node(move, node, step))
+
+        kept = heapq.nsmallest(width, children.values(),
+                               key=lambda child: child[:2])
+        layer = [(g, node) for _, g, node in kept]
+        seen.update(node.state.code for _, node in layer)
+        depth += 1
+        if layer:
+            depth_states[depth] = len(layer)
+
+    return {'visited': expanded, 'solutions': [], 'depth_states': depth_states}
+
+
+class TranspositionTable(object):
+    """
+    Fixed-size IDA* table indexed by Zobrist key.
+
+    Each entry keeps the cheapest cost g at which its state was reached in
+    the current iteration, used to prune duplicates, and the best lower
+    bound on its remaining cost backed up from its exhausted subtrees,
+    kept across iterations. Memory is allocated once, so it does not grow
+    with the puzzle. When two states share a slot in the same iteration,
+    the one reached with the smaller g is kept: its subtree is the larger
+    one to prune. Only the 64 bit key is stored, so a key collision could
+    prune a state wrongly; at these table sizes that is negligible.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.keys = array('Q', bytes(8 * size))
+        self.costs = array('q', bytes(8 * size))
+        self.stamps = array('q', bytes(8 * size))   # 0: never used
+        self.bounds = array('q', bytes(8 * size))
+
+    def bound(self, key):
+        """Learned lower bound on the remaining cost of a state, or 0."""
+        slot = key % self.size
+        if self.stamps[slot] and self.keys[slot] == key:
+            return self.bounds[slot]
+        return 0
+
+    def learn(self, key, bound):
+        """Raise the learned lower bound of a state if it has an entry."""
+        slot = key % self.size
+        if (self.stamps[slot] and self.keys[slot] == key and
+                self.bounds[slot] < bound):
+            self.bounds[slot] = bound
+
+    def prune(self, key, g, iteration):
+        """Record state key reached at cost g; return True if it was already
+        reached at a cost no higher than g in this iteration."""
+        slot = key % self.size
+        if self.stamps[slot] and self.keys[slot] == key:
+            if self.stamps[slot] == iteration and self.costs[slot] <= g:
+                return True
+        elif self.stamps[slot] == iteration and self.costs[slot] <= g:
+            return False   # Keep the other entry, it is closer to the root
+        else:
+            self.keys[slot] = key
+            self.bounds[slot] = 0
+        self.costs[slot] = g
+        self.stamps[slot] = iteration
+        return False
+
+
+def ida_star(initial_state, heuristic=heuristic, table_size=1 << 16,
+             check=True, stats=None):
+    """
+    Iterative-deepening A* for solving the Rush Hour puzzle.
+    Uses the same cost model as a_star_solver, but keeps only the current
+    path in memory, plus an optional fixed-size TranspositionTable.
+    Returns a dictionary with:
+        'visited': the number of nodes expanded over all iterations
+        'solutions': list with the optimal solution path, as a tuple of Nodes
+        'depth_states': dict mapping depth -> number of expanded states
+
+    Keyword Arguments:
+        heuristic: admissible estimate of the remaining cost of a state
+            (default=heuristic)
+        table_size: number of transposition table entries, 0 for none
+            (default=65536)
+        check: first prove the puzzle solvable with feasibility.check,
+            within the limits of stats when it is a stats.Budget. Without
+            a goal, the thresholds only stop rising once every path that
+            does not cross itself has been tried, which takes exponential
+            time; leave it out only for puzzles already checked
+            (default=True)
+        stats: a stats.SearchStats to fill in; duplicates counts the
+            children pruned by the path or the table (default=None)
+    """
+    length_of = initial_state.layout.length_of
+    if stats is not None:
+        heuristic = stats.timed(heuristic)
+    table = TranspositionTable(table_size) if table_size else None
+    expanded = 0
+    depth_states = dict()
+
+    if initial_state.solved():
+        return {'visited': 0,
+                'solutions': [(Node(initial_state),)],
+                'depth_states': depth_states}
+    if check:
+        from feasibility import check as feasible   # feasibility needs solver
+        budget = stats if hasattr(stats, 'check') else None
+        if feasible(initial_state, budget=budget)['solvable'] is False:
+            return {'visited': 0,
+                    'solutions': [],
+                    'depth_states': depth_states}
+
+    threshold = heuristic(initial_state)
+    iteration = 0
+    while threshold != float('inf'):
+        iteration += 1
+        next_threshold = float('inf')
+
+        # Path of [node, cost, successors still to try, lowest remaining
+        # cost bound through the children tried so far, and the same
+        # through the children in the subtree pruned for being on the path]
+        stack = [[Node(initial_state), 0, _successors(initial_state, stats),
+                  float('inf'), float('inf')]]
+        on_path = {initial_state}
+        if stats is not None:
+            on_path = stats.closed(on_path)
+            stats.expand(0, initial_state)
+        expanded += 1
+        depth_states[1] = depth_states.get(1, 0) + 1
+
+        while stack:
+            frame = stack[-1]
+            node, g, successors = frame[0], frame[1], frame[2]
+            for step, move in successors:
+                cost = length_of[step[0]]
+                h = heuristic(move)
+                if table is not None:
+                    h = max(h, table.bound(move.key))
+                if move in on_path:
+                    # A path through a cycle is never cheaper than the one
+                    # without it, so it bounds neither the next threshold
+                    # nor the subtree along this path
+                    if stats is not None:
+                        stats.duplicates += 1
+                    frame[4] = min(frame[4], cost + h)
+                    continue
+                if g + cost + h > threshold:
+                    next_threshold = min(next_threshold, g + cost + h)
+                    frame[3] = min(frame[3], cost + h)
+                    continue
+                if table is not None and table.prune(move.key, g + cost,
+                                                     iteration):
+                    if stats is not None:
+                        stats.duplicates += 1
+                    frame[3] = min(frame[3], cost + h)
+                    continue
+                child = Node(move, node, step)
+                if move.solved():
+                    return {'visited': expanded,
+                            'solutions': [child.path()],
+                            'depth_states': depth_states}
+                stack.append([child, g + cost, _successors(move, stats),
+                              float('inf'), float('inf')])
+                on_path.add(move)
+                if stats is not None:
+                    stats.expand(len(stack), move)
+                expanded += 1
+                depth = child.depth + 1
+                depth_states[depth] = depth_states.get(depth, 0) + 1
+                break
+            else:
+                # Subtree exhausted: pass its bounds to the parent. The
+                # table outlives this path, so what it learns also counts
+                # the children on the path, which another path could take
+                stack.pop()
+                on_path.discard(node.state)
+                bound = min(frame[3], frame[4])
+                if table is not None and bound != float('inf'):
+                    table.learn(node.state.key, bound)
+                if stack:
+                    parent = stack[-1]
+                    parent[3] = min(parent[3], g - parent[1] + frame[3])
+                    parent[4] = min(parent[4], g - parent[1] + frame[4])
+
+        threshold = next_threshold
+
+    return {'visited': expanded,
+            'solutions': [],
+            'depth_states': depth_states}
+
+
 #Depth First Search (DFS) algorithm
-def dfs(initial_state):
+def dfs(initial_state, stats=None, closed=None):
     #Initializes
-    visited = set()
+    visited = _closed_list(closed, stats, initial_state.layout)
     solutions = list()
     depth_states = dict()
-    #Stack to keep track to current path
+    #Stack of nodes, each linked to the node it was reached from
     stack = []
-    stack.append((initial_state, tuple()))
+    stack.append(Node(initial_state))
     while len(stack) != 0:
-        board, path = stack.pop()
-        new_path = path + tuple([board])
-        depth_states[len(new_path)] = depth_states.get(len(new_path), 0) + 1
+        node = stack.pop()
+        board = node.state
+        depth = node.depth + 1
+        depth_states[depth] = depth_states.get(depth, 0) + 1
 
         if board in visited:
+            if stats is not None:
+                stats.duplicates += 1
             continue
         else:
             visited.add(board)
+        if stats is not None:
+            stats.expand(len(stack), board)
 
         if board.solved():
-            solutions.append(new_path)
+            solutions.append(node.path())
         else:
-            stack.extend((move, new_path) for move in board.moves())
+            stack.extend(Node(move, node, step)
+                         for step, move in _successors(board, stats))
 
     # Return all found solutions
-    return {'visited': visited,
+    return {'visited': len(visited),
             'solutions': solutions,
             'depth_states': depth_states}
 
-def dls(initial_state, limit=100):
-    visited = dict()       #Must use dict to track depth
+def dls(initial_state, limit=100, stats=None):
+    visited = dict()       #Must use dict to track depth, by state code
+    if stats is not None:
+        visited = stats.closed(visited)
     solutions = []
     depth_states = dict()
 
     stack = []
-    stack.append((initial_state, tuple()))  # (state, path)
+    stack.append(Node(initial_state))
 
     while stack:
-        board, path = stack.pop()
-        new_path = path + (board,)
-        depth = len(new_path)
+        node = stack.pop()
+        board = node.state
+        depth = node.depth + 1
 
         depth_states[depth] = depth_states.get(depth, 0) + 1
 
-        if board in visited and visited[board] <= depth:
+        code = board.code
+        if code in visited and visited[code] <= depth:
+            if stats is not None:
+                stats.duplicates += 1
             continue
-        visited[board] = depth
+        visited[code] = depth
+        if stats is not None:
+            stats.expand(len(stack), board)
 
         if board.solved():
-            solutions.append(new_path)
+            solutions.append(node.path())
         elif depth < limit:
-            for move in board.moves():
-                stack.append((move, new_path))
+            for step, move in _successors(board, stats):
+                stack.append(Node(move, node, step))
 
     # Return all found solutions within the limit
     return {
         'solutions': solutions,
         'depth_states': depth_states,
-        'visited': visited
-    }
\ No newline at end of file
+        'visited': len(visited)
+    }
+
+
+SOLVERS = {
+    'bfs': bfs,
+    'lbfs': layered_bfs,
+    'dfs': dfs,
+    'dls': dls,
+    'ucs': ucs,
+    'a*': a_star_solver,
+    'awa*': anytime_a_star,
+    'beam': beam_search,
+    'ida*': ida_star,
+    'bibfs': bidirectional_bfs,
+}
+"""Search functions by the name used on the command line."""
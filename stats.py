@@ -0,0 +1,288 @@
+import threading
+import time
+
+try:
+    import resource
+except ImportError:   # Not on Windows
+    resource = None
+
+from solver import heuristic
+
+PAGE_KB = resource.getpagesize() // 1024 if resource is not None else None
+"""Size of a memory page, in KB, or None where it is not known."""
+
+
+def resident_memory():
+    """Resident set size of the process now, in KB. Where the system does
+    not report it (no /proc), the peak resident set size so far, and None
+    where there is no resource module either (Windows)."""
+    if resource is None:
+        return None
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * PAGE_KB
+    except (OSError, ValueError, IndexError):
+        return peak_memory()
+
+
+def peak_memory():
+    """Peak resident set size of the process so far, in KB on Linux, or
+    None where there is no resource module (Windows)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def reset_peak_memory():
+    """Restart the peak resident set size of the process, that
+    resource.getrusage() reports as ru_maxrss, from its current size.
+    Returns False where the system cannot (Linux before 4.0, no /proc)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class SearchCancelled(Exception):
+    """Raised from a stats callback to stop the search that calls it."""
+
+
+class BudgetExhausted(SearchCancelled):
+    """Raised by a Budget when the search it meters must stop.
+
+    Attributes:
+        reason: one of 'expanded', 'deadline', 'open', 'memory' or
+            'cancelled'
+    """
+
+    def __init__(self, reason):
+        super().__init__('Search stopped: {0}'.format(reason))
+        self.reason = reason
+
+
+class SearchStats(object):
+    """Counters and timers filled in by a search.
+
+    Pass an instance as the stats keyword of any solver in solver.py. It
+    counts expanded nodes, generated children, duplicate hits in the closed
+    list and the peak size of the open list, and times moves(), closed-list
+    lookups (hashing) and the heuristic. Solvers called without stats skip
+    all of this. A callback may raise SearchCancelled to stop the search,
+    and anytime solvers report each better solution with improve().
+
+    Keyword Arguments:
+        every: call callback after every this many expansions, 0 for never
+        callback: function called with this SearchStats object
+    """
+
+    def __init__(self, every=0, callback=None):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.peak_open = 0
+        self.moves_time = 0.0
+        self.hash_time = 0.0
+        self.heuristic_time = 0.0
+        self.best = None
+        self.every = every if callback is not None else 0
+        self.callback = callback
+        self.start_time = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        """Seconds since the stats were created."""
+        return time.perf_counter() - self.start_time
+
+    def expand(self, open_size, state=None):
+        """Record the expansion of state with open_size nodes still
+        waiting."""
+        self.expanded += 1
+        if open_size > self.peak_open:
+            self.peak_open = open_size
+        if self.every and self.expanded % self.every == 0:
+            self.callback(self)
+
+    def improve(self, solution):
+        """Record solution, a tuple of Nodes, as the best one so far."""
+        self.best = solution
+
+    def successors(self, board, slide=False):
+        """List of board.successors(), or board.slide_successors() if slide,
+        timed and counted."""
+        start_time = time.perf_counter()
+        if slide:
+            children = list(board.slide_successors())
+        else:
+            children = list(board.successors())
+        self.moves_time += time.perf_counter() - start_time
+        self.generated += len(children)
+        return children
+
+    def timed(self, heuristic):
+        """Wrap a heuristic function so its calls are timed."""
+        def timed_heuristic(state):
+            start_time = time.perf_counter()
+            h = heuristic(state)
+            self.heuristic_time += time.perf_counter() - start_time
+            return h
+        return timed_heuristic
+
+    def closed(self, container):
+        """Wrap a closed-list set or dict so its lookups are timed."""
+        return TimedClosed(container, self)
+
+    def as_dict(self):
+        return {'expanded': self.expanded,
+                'generated': self.generated,
+                'duplicates': self.duplicates,
+                'peak_open': self.peak_open,
+                'moves_time': self.moves_time,
+                'hash_time': self.hash_time,
+                'heuristic_time': self.heuristic_time,
+                'elapsed': self.elapsed}
+
+    def __repr__(self):
+        return ('SearchStats(expanded={0}, generated={1}, duplicates={2}, '
+                'peak_open={3}, moves={4:.4f}s, hash={5:.4f}s, '
+                'heuristic={6:.4f}s)'.format(
+                    self.expanded, self.generated, self.duplicates,
+                    self.peak_open, self.moves_time, self.hash_time,
+                    self.heuristic_time))
+
+
+class TimedClosed(object):
+    """A set or dict of states whose lookups are timed by a SearchStats."""
+
+    def __init__(self, container, stats):
+        self.container = container
+        self.stats = stats
+
+    def __contains__(self, state):
+        start_time = time.perf_counter()
+        found = state in self.container
+        self.stats.hash_time += time.perf_counter() - start_time
+        return found
+
+    def add(self, state):
+        start_time = time.perf_counter()
+        self.container.add(state)
+        self.stats.hash_time += time.perf_counter() - start_time
+
+    def discard(self, state):
+        start_time = time.perf_counter()
+        self.container.discard(state)
+        self.stats.hash_time += time.perf_counter() - start_time
+
+    def __getitem__(self, state):
+        start_time = time.perf_counter()
+        value = self.container[state]
+        self.stats.hash_time += time.perf_counter() - start_time
+        return value
+
+    def __setitem__(self, state, value):
+        start_time = time.perf_counter()
+        self.container[state] = value
+        self.stats.hash_time += time.perf_counter() - start_time
+
+    def __len__(self):
+        return len(self.container)
+
+    def __iter__(self):
+        return iter(self.container)
+
+    def keys(self):
+        return self.container.keys()
+
+
+class Budget(SearchStats):
+    """
+    Limits on a search, checked at every expansion.
+
+    A Budget is a SearchStats, so it is passed as the stats keyword of any
+    solver. When a limit is reached, or cancel() is called from another
+    thread, the next expansion raises BudgetExhausted; run() turns that
+    into a partial result. It also keeps the expanded state nearest to
+    the goal by the solver's default heuristic, to report as progress.
+
+    Keyword Arguments:
+        max_expanded: most states to expand (default=None, no limit)
+        deadline: most seconds to search for (default=None)
+        max_open: most states waiting in the open list (default=None)
+        max_memory: most resident memory of the process, in KB, as
+            resident_memory() reports it now rather than its peak, so
+            that an earlier search in the same process does not count;
+            it is checked every 1024 expansions, and never where
+            resident_memory() has no measurement (default=None)
+        token: an object with is_set(), such as a threading.Event, shared
+            to cancel several searches at once (default=a new Event)
+        every: call callback after every this many expansions, 0 for never
+        callback: function called with this Budget
+    """
+
+    def __init__(self, max_expanded=None, deadline=None, max_open=None,
+                 max_memory=None, token=None, every=0, callback=None):
+        super().__init__(every, callback)
+        self.max_expanded = max_expanded
+        self.deadline = deadline
+        self.max_open = max_open
+        self.max_memory = max_memory
+        self.token = threading.Event() if token is None else token
+        self.best_state = None
+        self.best_h = float('inf')
+
+    def cancel(self):
+        """Stop the search at its next expansion; safe from any thread."""
+        self.token.set()
+
+    def check(self, open_size=0, memory=True):
+        """Raise BudgetExhausted if a limit is reached, without counting
+        an expansion; memory is only measured when memory is True."""
+        if self.token.is_set():
+            raise BudgetExhausted('cancelled')
+        if self.max_expanded is not None and \
+                self.expanded >= self.max_expanded:
+            raise BudgetExhausted('expanded')
+        if self.max_open is not None and open_size > self.max_open:
+            raise BudgetExhausted('open')
+        if self.deadline is not None and self.elapsed >= self.deadline:
+            raise BudgetExhausted('deadline')
+        if memory and self.max_memory is not None:
+            resident = resident_memory()
+            if resident is not None and resident > self.max_memory:
+                raise BudgetExhausted('memory')
+
+    def expand(self, open_size, state=None):
+        self.check(open_size, self.expanded % 1024 == 0)
+        super().expand(open_size, state)
+        if state is not None:
+            h = heuristic(state)
+            if h <= self.best_h:
+                self.best_h = h
+                self.best_state = state
+
+    def run(self, search, problem, **options):
+        """
+        Call search(problem, stats=self, **options) within the budget.
+        Returns the results of the search, with two more fields:
+            'stopped': None when the search ran to its end, otherwise why
+                it stopped: a BudgetExhausted reason, or 'memory' when it
+                ran out of memory
+            'stats': the counters of as_dict()
+        A stopped search gives its best solution so far, if it reported
+        one with improve(), and adds:
+            'best_state': the expanded state nearest to the goal
+        """
+        try:
+            results = search(problem, stats=self, **options)
+            results['stopped'] = None
+        except (BudgetExhausted, MemoryError) as e:
+            reason = e.reason if isinstance(e, BudgetExhausted) else 'memory'
+            results = {'visited': self.expanded,
+                       'solutions': [] if self.best is None else [self.best],
+                       'depth_states': {},
+                       'stopped': reason,
+                       'best_state': self.best_state}
+        results['stats'] = self.as_dict()
+        return results
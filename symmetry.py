@@ -0,0 +1,97 @@
+"""
+Canonical labelling of boards whose vehicles differ only by id.
+
+Two non-goal vehicles of the same length are interchangeable: a board
+where they swap ids is the same puzzle position. canonical() renames the
+vehicles of a board so that all such relabellings get the same ids, and
+returns the renaming so that solutions found for the canonical board can
+be mapped back to the concrete ids of the original one.
+
+Cars are renamed A, B, C, ... and trucks O, P, Q, R, in order of
+(orientation, lane, position). Boards with other lengths, or more cars or
+trucks than there are classic ids, name the vehicles of length n vn_1,
+vn_2, ... in the same order instead. A vehicle never leaves its lane and never
+passes another vehicle of the same lane, so this order, and hence the
+renaming, is the same for every state reachable from a board: within one
+search the canonical state codes are a fixed permutation of the concrete
+ones and merge nothing. The gain is across boards, for instance puzzles
+of a collection that are relabellings of each other, which share their
+entries in the solution cache.
+
+syntax: python symmetry.py Map/map_01.txt [Map/map_02.txt ...]
+        (groups the maps that are relabellings of each other)
+"""
+import itertools
+import sys
+
+from problem import Problem, load_file
+from vehicle import CAR_IDS, TRUCK_IDS, Vehicle
+
+GOAL_ID = 'X'
+
+CANONICAL_CARS = tuple(sorted(CAR_IDS - {GOAL_ID}))
+"""Ids given to the non-goal cars of a canonical board, in order."""
+
+CANONICAL_TRUCKS = tuple(sorted(TRUCK_IDS))
+"""Ids given to the trucks of a canonical board, in order."""
+
+
+def renaming(problem):
+    """Map of each vehicle id of problem to its canonical id."""
+    order = sorted((v.orientation, v.y if v.orientation == 'H' else v.x,
+                    v.x + v.y, v.id, v.length) for v in problem.vehicles
+                   if v.id != GOAL_ID)
+    counts = dict()
+    for *_, length in order:
+        counts[length] = counts.get(length, 0) + 1
+    if set(counts) <= {2, 3} and counts.get(2, 0) <= len(CANONICAL_CARS) \
+            and counts.get(3, 0) <= len(CANONICAL_TRUCKS):
+        pools = {2: iter(CANONICAL_CARS), 3: iter(CANONICAL_TRUCKS)}
+    else:
+        pools = {length: ('v{0}_{1}'.format(length, k)
+                          for k in itertools.count(1))
+                 for length in counts}
+    names = {vid: next(pools[length]) for _, _, _, vid, length in order}
+    if GOAL_ID in problem.layout.index:
+        names[GOAL_ID] = GOAL_ID
+    return names
+
+
+def canonical(problem):
+    """Return (canonical board, renaming) for problem; see renaming()."""
+    names = renaming(problem)
+    board = Problem([Vehicle(names[v.id], v.x, v.y, v.orientation, v.length)
+                     for v in problem.vehicles], problem.layout.geometry)
+    return board, names
+
+
+def rename_steps(steps, names):
+    """Steps of solution_steps() with every vehicle id renamed by names.
+
+    Use the inverse of a renaming to map the steps of a canonical board
+    back to the concrete board.
+    """
+    renamed = []
+    for step in steps:
+        vid = step.rstrip('0123456789')[:-1]
+        renamed.append(names[vid] + step[len(vid):])
+    return renamed
+
+
+def inverse(names):
+    """The renaming that undoes names."""
+    return {new: old for old, new in names.items()}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    classes = dict()
+    for filename in sys.argv[1:]:
+        with open(filename) as rushhour_file:
+            board, _ = canonical(load_file(rushhour_file))
+        classes.setdefault(board, []).append(filename)
+    for filenames in classes.values():
+        print(' '.join(filenames))
+    print(f"{len(sys.argv) - 1} boards, {len(classes)} distinct")
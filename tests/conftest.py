@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""The repository root, where the modules and Map/ are."""
+
+sys.path.insert(0, ROOT)
+
+from problem import load_file   # noqa: E402  (needs ROOT on sys.path)
+
+
+@pytest.fixture
+def load_map():
+    """Function loading Map/map_<number>.txt as a Problem."""
+    def load(number):
+        filename = os.path.join(ROOT, 'Map', 'map_{0:02d}.txt'.format(number))
+        with open(filename) as rushhour_file:
+            return load_file(rushhour_file)
+    return load
@@ -0,0 +1,72 @@
+"""Solutions stored in the cache come back for the same board."""
+import sqlite3
+
+import pytest
+
+from cache import SCHEMA, SolutionCache
+from problem import Problem, solution_cost, solution_steps
+from solver import a_star_solver, bfs, dfs
+from vehicle import Vehicle
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with SolutionCache(str(tmp_path / 'sub' / 'solutions.db')) as cache:
+        yield cache
+
+
+def test_round_trip(cache, load_map):
+    problem = load_map(9)
+    results = a_star_solver(problem)
+    assert cache.get(problem, 'a*') is None
+    cache.put(problem, 'a*', results)
+    cached = cache.get(problem, 'a*')
+    assert cached['visited'] == results['visited']
+    assert solution_steps(cached['solutions'][0]) == \
+        solution_steps(results['solutions'][0])
+    assert solution_cost(cached['solutions'][0]) == 32
+    assert cached['solutions'][0][-1].state.solved()
+    # Other algorithms, cost models and move models have entries of their own
+    assert cache.get(problem, 'bfs') is None
+    assert cache.get(problem, 'a*', 'unit') is None
+    assert cache.get(problem, 'a*', model='slide') is None
+    assert len(cache) == 1
+
+
+def test_relabelled_board(cache, load_map):
+    problem = load_map(2)
+    cache.put(problem, 'bfs', bfs(problem))
+    # The same board with two cars swapping ids shares the entry
+    swap = {'A': 'B', 'B': 'A'}
+    relabelled = Problem([Vehicle(swap.get(v.id, v.id), v.x, v.y,
+                                  v.orientation, v.length)
+                          for v in problem.vehicles])
+    cached = cache.get(relabelled, 'bfs')
+    assert cached['solutions'][0][0].state == relabelled
+    assert cached['solutions'][0][-1].state.solved()
+    assert len(cached['solutions'][0]) - 1 == 7
+
+
+def test_no_solution(cache, load_map):
+    problem = load_map(17)
+    cache.put(problem, 'a*', {'visited': 3, 'solutions': []})
+    assert cache.get(problem, 'a*') == {'visited': 3, 'solutions': []}
+
+
+def test_dfs_not_cached(cache, load_map):
+    problem = load_map(2)
+    cache.put(problem, 'dfs', dfs(problem))
+    assert cache.get(problem, 'dfs') is None
+    assert len(cache) == 0
+
+
+def test_old_entries_dropped(tmp_path, load_map):
+    filename = str(tmp_path / 'solutions.db')
+    with SolutionCache(filename) as cache:
+        cache.put(load_map(2), 'a*', a_star_solver(load_map(2)))
+    connection = sqlite3.connect(filename)
+    with connection:
+        connection.execute('UPDATE solutions SET schema = ?', (SCHEMA - 1,))
+    connection.close()
+    with SolutionCache(filename) as cache:
+        assert cache.get(load_map(2), 'a*') is None
@@ -0,0 +1,48 @@
+"""Unsolvable maps are found without searching them."""
+import io
+
+import pytest
+
+from feasibility import check, component, precheck
+from problem import load_file
+from stats import Budget, BudgetExhausted
+
+REASONS = {
+    17: 'O can never leave the path of X to the exit',
+    18: 'A is right of X in its row',
+    19: 'O can never leave the path of X to the exit',
+    20: 'C can never leave the path of X to the exit',
+}
+
+
+@pytest.mark.parametrize('number', sorted(REASONS))
+def test_unsolvable(load_map, number):
+    problem = load_map(number)
+    assert precheck(problem) == REASONS[number]
+    assert check(problem) == {'solvable': False, 'reason': REASONS[number],
+                              'states': 0}
+    # Walking the whole component agrees with the precheck
+    solvable, states = component(problem)
+    assert solvable is False
+    assert states > 0
+
+
+@pytest.mark.parametrize('number', range(1, 17))
+def test_solvable(load_map, number):
+    problem = load_map(number)
+    assert precheck(problem) is None
+    assert check(problem)['solvable'] is True
+    assert check(problem, exhaustive=False)['solvable'] is None
+
+
+def test_limit_and_budget(load_map):
+    assert check(load_map(16), limit=10)['solvable'] is None
+    # A wall before the exit, with a component of 7084 states around it
+    problem = load_file(io.StringIO('size 8 8\nwall 7 3\nX 0 3 H\n'
+                                    'A 0 0 H\nB 0 5 V\nC 4 5 H\nO 5 0 V\n'))
+    assert precheck(problem) == 'a wall is in the path of X to the exit'
+    assert component(problem) == (False, 7084)
+    budget = Budget()
+    budget.cancel()
+    with pytest.raises(BudgetExhausted):
+        component(problem, budget=budget)
@@ -0,0 +1,58 @@
+"""Boards other than the classic one: any vehicle ids and lengths, sizes,
+walls and exits."""
+import io
+
+import pytest
+
+from feasibility import check
+from problem import CLASSIC, Geometry, load_file, map_lines, solution_cost
+from solver import a_star_solver, layered_bfs, ucs
+
+
+def load(text):
+    return load_file(io.StringIO(text))
+
+
+@pytest.mark.parametrize('text', [
+    'X 1 2 H\nbus7 0 0 V 2\n',    # An id outside CAR_IDS and TRUCK_IDS
+    'X 1 2 H\nA 4 0 V 3\n',       # A classic id with another length
+])
+def test_non_classic_vehicles_on_classic_board(text):
+    problem = load(text)
+    assert problem.layout.geometry == CLASSIC
+    results = a_star_solver(problem)
+    assert results['solutions']
+    assert load(text.replace('\n', '\nsize 6 6\n', 1)) == problem
+
+
+def test_non_classic_length_is_solved_with_its_length():
+    problem = load('X 1 2 H\nA 4 0 V 3\n')
+    solution = ucs(problem)['solutions'][0]
+    # A moves down three cells (3 x 3) before X slides out (3 x 2)
+    assert solution_cost(solution) == 15
+
+
+def test_non_classic_vehicles_on_8x8_board():
+    problem = load('size 8 8\nX 0 3 H\nbus7 5 0 V 4\nA 2 2 V\n'
+                   'lorry 3 6 H 5\n')
+    assert problem.layout.geometry == Geometry(8, 8)
+    assert check(problem)['solvable']
+    assert solution_cost(ucs(problem)['solutions'][0]) == \
+        solution_cost(a_star_solver(problem)['solutions'][0])
+    assert load('\n'.join(map_lines(problem))) == problem
+
+
+def test_walls_and_exit():
+    problem = load('size 8 7\nwall 5 0\nwall 7 6\nexit L 3\n'
+                   'X 4 3 H\nA 2 1 V\nbus 1 2 V 3\nO 6 0 V\n')
+    solution = a_star_solver(problem)['solutions'][0]
+    assert solution_cost(solution) == 14
+    assert len(layered_bfs(problem)['solutions'][0]) - 1 == 6
+    assert check(load('size 6 6\nwall 5 2\nX12H\n'))['solvable'] is False
+
+
+def test_vehicle_on_wall_or_off_board():
+    with pytest.raises(ValueError):
+        load('wall 2 2\nX12H\n')
+    with pytest.raises(ValueError):
+        load('X 5 2 H\n')
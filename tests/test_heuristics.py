@@ -0,0 +1,30 @@
+"""Heuristics never overestimate the exact distances of a component."""
+import pytest
+
+from distances import DistanceTable
+from heuristics import HEURISTICS, PatternDatabase
+
+SMALL = (2, 4, 13, 16)
+"""Maps whose components hold a few thousand states."""
+
+
+@pytest.mark.parametrize('number', SMALL)
+def test_admissible(load_map, number):
+    problem = load_map(number)
+    layout = problem.layout
+    table = DistanceTable.build(problem)
+    heuristics = dict(HEURISTICS, pdb=PatternDatabase.build(problem))
+    for code, distance in table.distances['length'].items():
+        state = layout.state(layout.decode(code))
+        for name, heuristic in heuristics.items():
+            assert heuristic(state) <= distance, name
+        # The default heuristic is admissible for single moves as well
+        assert HEURISTICS['cells'](state) <= table.distances['unit'][code]
+
+
+def test_goal_is_zero(load_map):
+    problem = load_map(2)
+    goal = next(iter(problem.goal_states()))
+    heuristics = dict(HEURISTICS, pdb=PatternDatabase.build(problem))
+    for name, heuristic in heuristics.items():
+        assert heuristic(goal) == 0, name
@@ -0,0 +1,37 @@
+"""SolutionDag counts and lists the same optimal solutions."""
+import pytest
+
+from optimal import SolutionDag, all_optimal
+from problem import solution_cost, solution_steps
+
+
+@pytest.mark.parametrize('number,model,cost', [
+    (2, 'step', 'length'), (2, 'slide', 'length'), (2, 'slide', 'unit'),
+    (4, 'step', 'length'), (11, 'step', 'unit'), (11, 'slide', 'length'),
+    (12, 'slide', 'unit'),
+])
+def test_count_matches_enumeration(load_map, number, model, cost):
+    problem = load_map(number)
+    dag = SolutionDag.build(problem, model, cost)
+    solutions = list(dag.solutions())
+    assert len(solutions) == dag.count()
+    assert len({tuple(solution_steps(solution))
+                for solution in solutions}) == dag.count()
+    for solution in solutions:
+        assert solution[0].state == problem
+        assert solution[-1].state.solved()
+        assert solution_cost(solution, cost) == dag.cost
+
+
+def test_all_optimal_limit(load_map):
+    results = all_optimal(load_map(4), limit=5)
+    assert len(results['solutions']) == 5
+    assert results['count'] == 2052
+    assert results['cost'] == 58
+
+
+def test_unsolvable(load_map):
+    dag = SolutionDag.build(load_map(17))
+    assert dag.count() == 0
+    assert dag.cost is None
+    assert list(dag.solutions()) == []
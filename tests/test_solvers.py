@@ -0,0 +1,65 @@
+"""Every solver against the optimal solutions of the bundled maps."""
+import pytest
+
+from solver import SOLVERS
+from problem import solution_cost
+
+SOLVABLE = range(1, 17)
+UNSOLVABLE = range(17, 21)
+
+MOVES = {1: 33, 2: 7, 3: 16, 4: 22, 5: 16, 6: 16, 7: 22, 8: 33, 9: 15,
+         10: 19, 11: 12, 12: 14, 13: 16, 14: 81, 15: 82, 16: 63}
+"""Fewest moves of the solution of each solvable map, one cell each."""
+
+COSTS = {1: 83, 2: 14, 3: 44, 4: 58, 5: 44, 6: 39, 7: 58, 8: 83, 9: 32,
+         10: 42, 11: 24, 12: 30, 13: 38, 14: 188, 15: 183, 16: 150}
+"""Lowest length cost (vehicle length times cells moved) of each map."""
+
+FEWEST_MOVES = ('bfs', 'lbfs', 'bibfs')
+CHEAPEST = ('ucs', 'a*', 'awa*', 'ida*')
+ANY = ('dfs', 'beam')
+
+SLOW = {('ida*', 14), ('ida*', 15), ('ida*', 16)}
+"""Runs of a minute or more, left out."""
+
+
+def check_solution(problem, solution):
+    assert solution[0].state == problem
+    assert solution[-1].state.solved()
+    for parent, node in zip(solution, solution[1:]):
+        assert (node.move, node.state) in parent.state.successors()
+
+
+def cases(names, maps):
+    return [(name, number) for name in names for number in maps
+            if (name, number) not in SLOW]
+
+
+@pytest.mark.parametrize('name,number', cases(FEWEST_MOVES, SOLVABLE))
+def test_fewest_moves(load_map, name, number):
+    problem = load_map(number)
+    solution = SOLVERS[name](problem)['solutions'][0]
+    check_solution(problem, solution)
+    assert len(solution) - 1 == MOVES[number]
+
+
+@pytest.mark.parametrize('name,number', cases(CHEAPEST, SOLVABLE))
+def test_cheapest(load_map, name, number):
+    problem = load_map(number)
+    solution = SOLVERS[name](problem)['solutions'][0]
+    check_solution(problem, solution)
+    assert solution_cost(solution) == COSTS[number]
+
+
+@pytest.mark.parametrize('name,number', cases(ANY, SOLVABLE))
+def test_any_solution(load_map, name, number):
+    problem = load_map(number)
+    solution = SOLVERS[name](problem)['solutions'][0]
+    check_solution(problem, solution)
+    assert solution_cost(solution) >= COSTS[number]
+
+
+@pytest.mark.parametrize('name,number', cases(FEWEST_MOVES + CHEAPEST,
+                                              UNSOLVABLE))
+def test_unsolvable(load_map, name, number):
+    assert SOLVERS[name](load_map(number))['solutions'] == []
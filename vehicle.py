@@ -2,66 +2,149 @@ CAR_IDS = {'X', 'A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K'}
 TRUCK_IDS = {'O', 'P', 'Q', 'R'}
 """ Goal vehicle ID: X"""
 
+BOARD_SIZE = 6
+"""Width and height of the classic board the placements are made for."""
+
+
+def default_length(id):
+    """Length of a vehicle with a classic id: 2 for cars, 3 for trucks;
+    None for any other id."""
+    if id in CAR_IDS:
+        return 2
+    if id in TRUCK_IDS:
+        return 3
+    return None
+
+
 class Vehicle(object):
-    """A configuration of a single vehicle."""
+    """A placement of a single vehicle.
 
-    def __init__(self, id, x, y, orientation):
-        """Create a new vehicle.
+    Every valid (id, x, y, orientation) placement of the classic ids on
+    the classic 6x6 board is created once, in PLACEMENTS, and Vehicle(...)
+    returns that shared instance, so equal vehicles are the same object.
+    Other placements, of any id and length and at any coordinates, are
+    interned the first time they are made. Whether a placement fits a
+    board is checked by the board (see problem.Geometry). Placements are
+    immutable and carry their hash; those of the classic table also carry
+    their occupancy mask on the classic board (bit y * 6 + x for cell
+    (x, y)) and the placements one slide away.
+    """
+
+    __slots__ = ('id', 'x', 'y', 'orientation', 'length', 'mask', 'slides',
+                 '_hash')
+
+    def __new__(cls, id, x, y, orientation, length=None):
+        """Return the vehicle placement.
 
         Arguments:
-            id: a valid car or truck id character
-            x: the x coordinate of the top left corner of the vehicle (0-5)
-            y: the y coordinate of the top left corner of the vehicle (0-5)
+            id: a non-empty vehicle id without white space
+            x: the x coordinate of the top left corner of the vehicle
+            y: the y coordinate of the top left corner of the vehicle
             orientation: either the vehicle is vertical (V) or horizontal (H)
 
+        Keyword Arguments:
+            length: cells covered by the vehicle, at least 1; required for
+                ids other than CAR_IDS and TRUCK_IDS (default=None)
+
         Exceptions:
-            ValueError: on invalid id, x, y, or orientation
+            ValueError: on invalid id, x, y, orientation or length
         """
-        if id in CAR_IDS:
-            self.id = id
-            self.length = 2
-        elif id in TRUCK_IDS:
-            self.id = id
-            self.length = 3
-        else:
-            raise ValueError('Invalid id {0}'.format(id))
-
-        if 0 <= x <= 5:
-            self.x = x
-        else:
+        if length is None and isinstance(id, str):
+            length = default_length(id)
+        if length is not None and length == default_length(id):
+            vehicle = PLACEMENTS.get((id, x, y, orientation))
+            if vehicle is not None:
+                return vehicle
+        key = (id, x, y, orientation, length)
+        vehicle = _INTERNED.get(key)
+        if vehicle is not None:
+            return vehicle
+        if not isinstance(id, str) or not id or id != ''.join(id.split()):
+            raise ValueError('Invalid id {0!r}'.format(id))
+        if length is None:
+            raise ValueError('Length of vehicle {0} is needed'.format(id))
+        if not isinstance(length, int) or length < 1:
+            raise ValueError('Invalid length {0}'.format(length))
+        if not isinstance(x, int) or x < 0:
             raise ValueError('Invalid x {0}'.format(x))
-
-        if 0 <= y <= 5:
-            self.y = y
-        else:
+        if not isinstance(y, int) or y < 0:
             raise ValueError('Invalid y {0}'.format(y))
-
-        if orientation == 'H':
-            self.orientation = orientation
-            x_end = self.x + (self.length - 1)
-            y_end = self.y
-        elif orientation == 'V':
-            self.orientation = orientation
-            x_end = self.x
-            y_end = self.y + (self.length - 1)
-        else:
+        if orientation not in ('H', 'V'):
             raise ValueError('Invalid orientation {0}'.format(orientation))
+        vehicle = cls._place(id, x, y, orientation, length, mask=None)
+        _INTERNED[key] = vehicle
+        return vehicle
 
-        if x_end > 5 or y_end > 5:
-            raise ValueError('Invalid configuration')
+    @classmethod
+    def _place(cls, id, x, y, orientation, length, mask):
+        """Build a placement."""
+        vehicle = object.__new__(cls)
+        for name, value in (('id', id), ('x', x), ('y', y),
+                            ('orientation', orientation), ('length', length),
+                            ('mask', mask), ('slides', ()),
+                            ('_hash', hash((id, x, y, orientation)))):
+            object.__setattr__(vehicle, name, value)
+        return vehicle
 
-    def __hash__(self):
-        return hash(self.__repr__())
+    def cells(self):
+        """List of the (x, y) cells the vehicle covers."""
+        if self.orientation == 'H':
+            return [(self.x + k, self.y) for k in range(self.length)]
+        return [(self.x, self.y + k) for k in range(self.length)]
 
-    def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+    def __setattr__(self, name, value):
+        raise AttributeError('Vehicle placements are immutable')
 
-    def __ne__(self, other):
-        return not self.__eq__(other)
+    def __reduce__(self):
+        return (Vehicle, (self.id, self.x, self.y, self.orientation,
+                          self.length))
+
+    def __hash__(self):
+        return self._hash
 
     def __lt__(self, other):
         return self.id < other.id
 
     def __repr__(self):
-        return "Vehicle({0}, {1}, {2}, {3})".format(self.id, self.x, self.y,
-                                                    self.orientation)
+        if self.length == default_length(self.id):
+            return "Vehicle({0}, {1}, {2}, {3})".format(
+                self.id, self.x, self.y, self.orientation)
+        return "Vehicle({0}, {1}, {2}, {3}, {4})".format(
+            self.id, self.x, self.y, self.orientation, self.length)
+
+
+_INTERNED = dict()
+"""Placements outside the classic table, by (id, x, y, orientation,
+length) as given to Vehicle()."""
+
+
+def _placements():
+    table = dict()
+    for id in sorted(CAR_IDS | TRUCK_IDS):
+        length = default_length(id)
+        for lane in range(BOARD_SIZE):
+            for p in range(BOARD_SIZE - length + 1):
+                for key in ((id, p, lane, 'H'), (id, lane, p, 'V')):
+                    _, x, y, orientation = key
+                    mask = 0
+                    for k in range(length):
+                        cx, cy = (x + k, y) if orientation == 'H' \
+                            else (x, y + k)
+                        mask |= 1 << (cy * BOARD_SIZE + cx)
+                    table[key] = Vehicle._place(id, x, y, orientation,
+                                                length, mask)
+    # slides: (direction, placement) for every placement one cell away
+    for (id, x, y, orientation), vehicle in table.items():
+        if orientation == 'H':
+            moves = (('L', (id, x - 1, y, 'H')), ('R', (id, x + 1, y, 'H')))
+        else:
+            moves = (('U', (id, x, y - 1, 'V')), ('D', (id, x, y + 1, 'V')))
+        object.__setattr__(vehicle, 'slides', tuple(
+            (direction, table[key]) for direction, key in moves
+            if key in table))
+    return table
+
+
+PLACEMENTS = _placements()
+"""Every placement of the classic ids on the classic board, by (id, x, y,
+orientation)."""